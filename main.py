@@ -10,28 +10,146 @@ from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 from fastapi.responses import HTMLResponse, FileResponse, JSONResponse
 import os
+import io
 import json
+import orjson
 import shutil
+import tempfile
 import uuid
-from typing import Dict, Optional, List, Set, Any
+import time
+import operator
+import logging
+from bisect import bisect_left
+from pathlib import PureWindowsPath
+from typing import Dict, Optional, List, Set, Any, Tuple
 from datetime import datetime, timedelta
-from collections import defaultdict
+from collections import Counter, defaultdict, deque
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from contextlib import asynccontextmanager, suppress
 import asyncio
+import numpy as np
+import pandas as pd
 
-from src.data.etl import get_column_mapping_template, validate_main_unit_measurement, validate_alternative_unit_measurement, read_excel, validate_column_values, load_row_mappings, add_row_mapping
+from src.data.etl import get_column_mapping_template, validate_main_unit_measurement, validate_alternative_unit_measurement, read_excel, read_excel_summary, validate_column_values, load_row_mappings, add_row_mappings_bulk, apply_value_mapping
 from src.utils.logger import get_api_logger, get_app_logger, get_data_processing_logger, get_error_logger, get_all_logs
-from src.email.email_scanner import get_emails_with_attachments, save_attachment_from_email, list_mail_folders
+from src.email.email_scanner import get_emails_with_attachments, fetch_single_email_by_uid, parse_email_id, save_attachment_from_email, list_mail_folders, GMAIL_USER, GMAIL_PASS, DEFAULT_MAIL_FOLDER
 from src.data.column_mapper import add_mapping, get_suggestions
 from src.pricing.engine import PricingEngine, PricingRequest, load_tariffs, KG_PER_M2
 
 
+def _parse_log_level(level_part: str) -> str:
+    """Strip whitespace and the optional surrounding brackets from a log level token"""
+    level_part = level_part.strip()
+    if level_part[:1] == "[" and level_part[-1:] == "]":
+        return level_part[1:-1]
+    return level_part
+
+
+@lru_cache(maxsize=50000)
+def _parse_log_message(message: str, sep: str) -> tuple:
+    """Return (level, actual_message) for a raw log line; level is None when the line has no level field"""
+    log_parts = message.split(sep, 3)
+    if len(log_parts) < 3:
+        return None, ""
+    actual_message = log_parts[3].strip() if len(log_parts) >= 4 else ""
+    return _parse_log_level(log_parts[2]), actual_message
+
+
+@lru_cache(maxsize=10000)
+def _hour_bucket(year: int, month: int, day: int, hour: int) -> tuple:
+    """Return the (day, hour) strings for one hour of log timestamps"""
+    return f"{year:04d}-{month:02d}-{day:02d}", f"{hour:02d}"
+
+
+def _timestamp_buckets(timestamp: datetime) -> tuple:
+    """Return the (day, hour) strings used to bucket a log timestamp"""
+    # Memoized per hour rather than per timestamp, so entries logged within the
+    # same hour share one formatted pair instead of two strftime calls each
+    return _hour_bucket(timestamp.year, timestamp.month, timestamp.day, timestamp.hour)
+
+
+# Above this many entries the stats are aggregated with pandas instead of a Python loop
+LOG_STATS_VECTORIZE_THRESHOLD = 5000
+
+
+def _series_counts(series: pd.Series) -> Dict[Any, int]:
+    """Count the values of a Series into a plain JSON-serializable dict"""
+    return {key: int(count) for key, count in series.value_counts(sort=False).items()}
+
+
+def _aggregate_logs_vectorized(filtered_logs) -> Dict[str, Any]:
+    """
+    Vectorized equivalent of the per-log loop in process_logs_for_stats
+
+    Args:
+        filtered_logs: Non-empty list of log entries, already filtered by type and date
+
+    Returns:
+        Dictionary with the same statistics the loop produces
+    """
+    df = pd.DataFrame({
+        'type': [log['type'] for log in filtered_logs],
+        'timestamp': [log['timestamp'] for log in filtered_logs],
+        'message': [log['message'] for log in filtered_logs],
+        'sep': [log['sep'] for log in filtered_logs],
+    })
+    # Group on numeric day/hour keys and format only the distinct values
+    df['day'] = df['timestamp'].dt.normalize()
+    df['hour'] = df['timestamp'].dt.hour
+
+    # Split each separator group at most into timestamp, component, level and message
+    df['level'] = None
+    df['actual_message'] = ""
+    for sep, group in df.groupby('sep', sort=False):
+        parts = group['message'].str.split(sep, n=3, expand=True).reindex(columns=range(4))
+        has_level = parts[2].notna()
+        if has_level.any():
+            levels = parts.loc[has_level, 2].str.strip()
+            bracketed = (levels.str[:1] == "[") & (levels.str[-1:] == "]")
+            levels[bracketed] = levels[bracketed].str[1:-1]
+            df.loc[levels.index, 'level'] = levels
+        df.loc[group.index, 'actual_message'] = parts[3].fillna("").str.strip()
+
+    # Histogram integer day/level/hour codes with np.bincount; the time series is a
+    # day x level matrix counted over the combined code
+    day_codes, days = pd.factorize(df['day'])
+    day_labels = [day.strftime('%Y-%m-%d') for day in days]
+    has_level = df['level'].notna().to_numpy()
+    level_codes, levels = pd.factorize(df.loc[has_level, 'level'])
+    matrix = np.bincount(
+        day_codes[has_level] * len(levels) + level_codes,
+        minlength=len(days) * len(levels)
+    ).reshape(len(days), len(levels))
+
+    time_series = defaultdict(dict)
+    for day_index, level_index in zip(*np.nonzero(matrix)):
+        time_series[day_labels[day_index]][levels[level_index]] = int(matrix[day_index, level_index])
+
+    messages = df.loc[df['actual_message'] != "", 'actual_message']
+    top_messages = messages.value_counts().head(10)
+
+    return {
+        'total': len(df),
+        'by_level': {level: int(count) for level, count in zip(levels, matrix.sum(axis=0))},
+        'by_logger': _series_counts(df['type']),
+        'by_day': {label: int(count) for label, count in zip(day_labels, np.bincount(day_codes, minlength=len(days)))},
+        'by_hour': {f"{hour:02d}": int(count) for hour, count in enumerate(np.bincount(df['hour'].to_numpy(), minlength=24)) if count},
+        'time_series': time_series,
+        'common_messages': [
+            {'message': message, 'count': int(count)}
+            for message, count in top_messages.items()
+        ]
+    }
+
+
 # Function to process logs and generate statistics
 def process_logs_for_stats(logs, log_type='all', days=7, start_date=None, end_date=None):
     """
     Process logs and generate statistics for charts
 
     Args:
-        logs: List of log entries
+        logs: List of log entries as returned by get_all_logs (sorted newest first)
         log_type: Type of logs to filter (all, api, app, data_processing, database, errors)
         days: Number of days to include
         start_date: Start date for filtering (format: YYYY-MM-DD)
@@ -40,137 +158,79 @@ def process_logs_for_stats(logs, log_type='all', days=7, start_date=None, end_da
     Returns:
         Dictionary with statistics
     """
-    # Filter logs by type if specified
-    if log_type != 'all':
-        logs = [log for log in logs if log['type'] == log_type]
-
-    # Filter logs by date range
-    filtered_logs = []
+    # Filter logs by date range first. get_all_logs returns entries newest first, so
+    # the window is a contiguous slice located by binary search
     if start_date and end_date:
         start = datetime.strptime(start_date, '%Y-%m-%d')
         end = datetime.strptime(end_date, '%Y-%m-%d')
         end = end.replace(hour=23, minute=59, second=59)  # Include the entire end day
 
-        for log in logs:
-            log_date = log['timestamp']
-            if start <= log_date <= end:
-                filtered_logs.append(log)
+        lo = bisect_left(logs, True, key=lambda log: log['timestamp'] <= end)
+        hi = bisect_left(logs, True, lo=lo, key=lambda log: log['timestamp'] < start)
+        filtered_logs = logs[lo:hi]
     else:
         # Use the last N days
         cutoff_date = datetime.now() - timedelta(days=days)
-        filtered_logs = [log for log in logs if log['timestamp'] >= cutoff_date]
+        filtered_logs = logs[:bisect_left(logs, True, key=lambda log: log['timestamp'] < cutoff_date)]
 
-    # Initialize counters
-    stats = {
-        'total': len(filtered_logs),
-        'by_level': defaultdict(int),
-        'by_logger': defaultdict(int),
-        'by_day': defaultdict(int),
-        'by_hour': defaultdict(int),
-        'time_series': defaultdict(lambda: defaultdict(int)),
-        'message_counts': defaultdict(int)  # For tracking common messages
-    }
+    # Then filter the (already narrowed) window by type if specified
+    if log_type != 'all':
+        filtered_logs = [log for log in filtered_logs if log['type'] == log_type]
 
-    # Process each log entry
-    for log in filtered_logs:
-        # Check if the log message uses tabs or dashes as separators
-        if "\t" in log['message']:
-            # New format with tabs
-            log_parts = log['message'].split("\t")
-            if len(log_parts) >= 3:
-                log_level_part = log_parts[2].strip()
-                # Handle format with brackets
-                if log_level_part.startswith("[") and log_level_part.endswith("]"):
-                    log_level = log_level_part[1:-1]  # Remove brackets
-                else:
-                    log_level = log_level_part
-                stats['by_level'][log_level] += 1
-        else:
-            # Old format with dashes
-            log_parts = log['message'].split(' - ')
-            if len(log_parts) >= 3:
-                log_level_part = log_parts[2].strip()
-                # Handle both formats (with or without brackets)
-                if log_level_part.startswith("[") and log_level_part.endswith("]"):
-                    log_level = log_level_part[1:-1]  # Remove brackets
-                else:
-                    log_level = log_level_part
-                stats['by_level'][log_level] += 1
-
-        # Count by logger type
-        stats['by_logger'][log['type']] += 1
-
-        # Count by day
-        day = log['timestamp'].strftime('%Y-%m-%d')
-        stats['by_day'][day] += 1
-
-        # Count by hour
-        hour = log['timestamp'].strftime('%H')
-        stats['by_hour'][hour] += 1
-
-        # Time series data (by day and log level)
-        day = log['timestamp'].strftime('%Y-%m-%d')
-
-        # Extract message content for common messages tracking
-        actual_message = ""
-
-        # Check if the log message uses tabs or dashes as separators
-        if "\t" in log['message']:
-            # New format with tabs
-            log_parts = log['message'].split("\t")
-            if len(log_parts) >= 3:
-                log_level_part = log_parts[2].strip()
-                # Handle format with brackets
-                if log_level_part.startswith("[") and log_level_part.endswith("]"):
-                    log_level = log_level_part[1:-1]  # Remove brackets
-                else:
-                    log_level = log_level_part
-                stats['time_series'][day][log_level] += 1
+    # Nothing to aggregate: return the empty response shape directly
+    if not filtered_logs:
+        return {
+            'total': 0,
+            'by_level': {},
+            'by_logger': {},
+            'by_day': {},
+            'by_hour': {},
+            'time_series': {},
+            'common_messages': []
+        }
 
-                # Extract actual message content (parts after the log level)
-                if len(log_parts) >= 4:
-                    actual_message = log_parts[3].strip()
-        else:
-            # Old format with dashes
-            log_parts = log['message'].split(' - ')
-            if len(log_parts) >= 3:
-                log_level_part = log_parts[2].strip()
-                # Handle both formats (with or without brackets)
-                if log_level_part.startswith("[") and log_level_part.endswith("]"):
-                    log_level = log_level_part[1:-1]  # Remove brackets
-                else:
-                    log_level = log_level_part
-                stats['time_series'][day][log_level] += 1
-
-                # Extract actual message content (parts after the log level)
-                if len(log_parts) >= 4:
-                    actual_message = log_parts[3].strip()
-
-        # Count message occurrences if we have a valid message
-        if actual_message:
-            stats['message_counts'][actual_message] += 1
-
-    # Convert defaultdicts to regular dicts for JSON serialization
-    stats['by_level'] = dict(stats['by_level'])
-    stats['by_logger'] = dict(stats['by_logger'])
-    stats['by_day'] = dict(stats['by_day'])
-    stats['by_hour'] = dict(stats['by_hour'])
-    stats['time_series'] = {k: dict(v) for k, v in stats['time_series'].items()}
-
-    # Convert message counts to array of objects sorted by count
-    message_counts = dict(stats['message_counts'])
-    common_messages = [
-        {'message': message, 'count': count}
-        for message, count in message_counts.items()
-    ]
-    # Sort by count in descending order and limit to top 10
-    common_messages.sort(key=lambda x: x['count'], reverse=True)
-    stats['common_messages'] = common_messages[:10]
-
-    # Remove the message_counts from the final stats
-    del stats['message_counts']
-
-    return stats
+    # Large windows are aggregated column-wise instead of per entry
+    if len(filtered_logs) >= LOG_STATS_VECTORIZE_THRESHOLD:
+        return _aggregate_logs_vectorized(filtered_logs)
+
+    # Parse every entry once (memoized per raw line and per timestamp, so repeated
+    # polls of the stats endpoint only parse lines they have not seen before)
+    buckets = [_timestamp_buckets(log['timestamp']) for log in filtered_logs]
+    parsed = [_parse_log_message(log['message'], log['sep']) for log in filtered_logs]
+
+    # Count with Counter's C-level counting loop instead of per-entry += updates
+    logger_counts = Counter(map(operator.itemgetter('type'), filtered_logs))
+    day_counts = Counter(map(operator.itemgetter(0), buckets))
+    hour_counts = Counter(map(operator.itemgetter(1), buckets))
+    series_counts = Counter(
+        (day, log_level)
+        for (day, _), (log_level, _) in zip(buckets, parsed)
+        if log_level is not None
+    )
+    message_counts = Counter(actual_message for _, actual_message in parsed if actual_message)
+
+    # Pivot the (day, level) counts into the time series and the per-level totals
+    level_counts = defaultdict(int)
+    time_series = defaultdict(dict)
+    for (day, log_level), count in series_counts.items():
+        level_counts[log_level] += count
+        time_series[day][log_level] = count
+
+    # Counter/defaultdict serialize as plain objects, so they are returned as-is;
+    # most_common selects the top 10 messages with a heap instead of sorting every
+    # distinct message
+    return {
+        'total': len(filtered_logs),
+        'by_level': level_counts,
+        'by_logger': logger_counts,
+        'by_day': day_counts,
+        'by_hour': hour_counts,
+        'time_series': time_series,
+        'common_messages': [
+            {'message': message, 'count': count}
+            for message, count in message_counts.most_common(10)
+        ]
+    }
 
 # Initialize loggers
 api_logger = get_api_logger()
@@ -178,10 +238,22 @@ app_logger = get_app_logger()
 data_logger = get_data_processing_logger()
 error_logger = get_error_logger()
 
+UPLOADS_DIR = "src/data/uploads"
+PROCESSED_DIR = "src/data/processed"
+
+# The processed and uploads folders contain only regular files written by the app
+REQUIRED_FOLDERS = ("src/static", PROCESSED_DIR, UPLOADS_DIR)
+
+def ensure_folders_exist():
+    """
+    Ensure that required folders exist
+    """
+    for folder in REQUIRED_FOLDERS:
+        os.makedirs(folder, exist_ok=True)
+    app_logger.debug(f"Required folders ready: {', '.join(REQUIRED_FOLDERS)}")
+
 # Create directories if they don't exist
-os.makedirs("src/static", exist_ok=True)
-os.makedirs("src/data/uploads", exist_ok=True)
-os.makedirs("src/data/processed", exist_ok=True)
+ensure_folders_exist()
 
 # Initialize pricing engine tariffs
 TARIFFS_BASE = os.path.join("src", "pricing", "tariffs")
@@ -194,12 +266,35 @@ except Exception as e:
     PRICING_ENGINE = None
     error_logger.error(f"Failed to initialize pricing engine: {e}")
 
+class ORJSONResponse(JSONResponse):
+    """
+    JSON response serialized with orjson (FastAPI's own ORJSONResponse is deprecated)
+    """
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Run the stale websocket connection sweep for the lifetime of the application
+    """
+    manager.cleanup_task = asyncio.create_task(cleanup_stale_connections_task())
+    try:
+        yield
+    finally:
+        manager.cleanup_task.cancel()
+        with suppress(asyncio.CancelledError):
+            await manager.cleanup_task
+        manager.cleanup_task = None
+
 api = FastAPI(
     title="Softone ERP Excel Formatter",
     description="An application to process Excel files for Softone ERP system",
     version="1.0.0",
     docs_url=None,  # Disable Swagger UI
-    redoc_url=None  # Disable ReDoc
+    redoc_url=None,  # Disable ReDoc
+    default_response_class=ORJSONResponse,
+    lifespan=lifespan
 )
 
 
@@ -215,11 +310,71 @@ api.add_middleware(
     allow_headers=["*"],
 )
 
+# Ordered (needle, device type) rules for the visitor hierarchy; the first needle
+# found in the inspected string wins. The reported platform is first matched exactly,
+# since only the bare "iPhone"/"iPad" platform values identify those devices
+PLATFORM_INFO_EXACT = {"iPhone": "iPhone", "iPad": "Tablet"}
+PLATFORM_INFO_RULES = (("Mac", "Laptop"), ("Win", "PC"), ("Android", "Android Phone"))
+USER_AGENT_RULES = (("iPhone", "iPhone"), ("iPad", "Tablet"), ("Android", "Android Phone"),
+                    ("Mobile", "Mobile"), ("Windows", "PC"), ("Macintosh", "Laptop"))
+BROWSER_PLATFORM_RULES = (("iPad", "Tablet"), ("iPhone", "iPhone"), ("Android", "Android Phone"),
+                          ("Mobile", "Mobile"), ("Windows", "PC"), ("Mac", "Laptop"),
+                          ("Safari", "Laptop"))
+
+def _classify_platform(value: Optional[str], rules: tuple) -> Optional[str]:
+    """Return the device type of the first rule whose needle occurs in value, or None"""
+    if not value:
+        return None
+    return next((label for needle, label in rules if needle in value), None)
+
+def _classify_device(platform_info: Optional[str], user_agent: Optional[str], browser: str) -> str:
+    """Return the device type for a browser, preferring the reported platform, then the user agent, then the browser name"""
+    return (
+        PLATFORM_INFO_EXACT.get(platform_info)
+        or _classify_platform(platform_info, PLATFORM_INFO_RULES)
+        or _classify_platform(user_agent, USER_AGENT_RULES)
+        or _classify_platform(browser, BROWSER_PLATFORM_RULES)
+        or "Other"
+    )
+
+# Presence changes within this many seconds are sent to clients as one broadcast
+PRESENCE_BROADCAST_DELAY = 0.05
+
+# Per-visitor caps on remembered tabs and browsers
+MAX_TABS_PER_VISITOR = 64
+MAX_BROWSERS_PER_VISITOR = 16
+
+class BoundedSet:
+    """
+    Insertion-ordered set holding at most maxlen items; adding to a full set evicts the oldest item
+    """
+    def __init__(self, maxlen: int):
+        self._order = deque()
+        self._items: Set[str] = set()
+        self.maxlen = maxlen
+
+    def add(self, item: str):
+        if item in self._items:
+            return
+        if len(self._order) >= self.maxlen:
+            self._items.discard(self._order.popleft())
+        self._order.append(item)
+        self._items.add(item)
+
+    def __contains__(self, item) -> bool:
+        return item in self._items
+
+    def __len__(self) -> int:
+        return len(self._order)
+
+    def __iter__(self):
+        return iter(self._order)
+
 # WebSocket connection manager
 class ConnectionManager:
     def __init__(self):
-        # Active connections
-        self.active_connections: List[WebSocket] = []
+        # Active connections keyed by connection ID
+        self.active_connections: Dict[str, WebSocket] = {}
         # Active users per application (kept for backward compatibility with frontend; populated from app_visitors)
         self.active_users: Dict[str, List[str]] = {
             "excel-formatter": [],
@@ -230,16 +385,20 @@ class ConnectionManager:
             "excel-formatter": set(),
             "retail-pricing": set()
         }
+        # Reverse index of app_visitors: the apps each visitor (or unidentified connection) is in
+        self.visitor_apps: Dict[str, Set[str]] = {}
         # Dictionary to track unique visitors by visitor ID
         self.unique_visitors: Dict[str, Dict] = {}
         # Dictionary to map connection IDs to visitor IDs
         self.connection_to_visitor: Dict[str, str] = {}
-        # Dictionary to track browsers per visitor
-        self.visitor_browsers: Dict[str, Set[str]] = {}
-        # Dictionary to track tabs per visitor
-        self.visitor_tabs: Dict[str, Set[str]] = {}
+        # Dictionary to track browsers per visitor (the most recent MAX_BROWSERS_PER_VISITOR)
+        self.visitor_browsers: Dict[str, BoundedSet] = {}
+        # Dictionary to track tabs per visitor (the most recent MAX_TABS_PER_VISITOR)
+        self.visitor_tabs: Dict[str, BoundedSet] = {}
         # Dictionary to track platform information per visitor
         self.visitor_platforms: Dict[str, Dict[str, str]] = {}
+        # Dictionary to track the device type per visitor and browser, classified once at identify time
+        self.visitor_device_labels: Dict[str, Dict[str, str]] = {}
         # Dictionary to track masked IP per visitor
         self.visitor_ips: Dict[str, str] = {}
         # Dictionary to track device info (type and OS) per visitor
@@ -250,18 +409,36 @@ class ConnectionManager:
         self.last_heartbeat: Dict[str, datetime] = {}
         # Heartbeat timeout in seconds (30 seconds)
         self.heartbeat_timeout = 30
+        # Periodic stale connection sweep, started and stopped by the app lifespan
+        self.cleanup_task: Optional[asyncio.Task] = None
+        # Pending coalesced presence broadcast, if one is scheduled
+        self._presence_broadcast_task: Optional[asyncio.Task] = None
+        # Set by every change, cleared when a broadcast picks the changes up
+        self._presence_changed = False
+        # Cached visitor hierarchy; rebuilt only after visitor/browser/tab data changes
+        self._hierarchy_cache: Optional[dict] = None
+        self._hierarchy_dirty = True
+        # Running totals sent with every message, so broadcasts do not re-sum the dictionaries
+        self._total_active_users = 0
+        self._browser_count = 0
+        self._tab_count = 0
 
     async def connect(self, websocket: WebSocket, connection_id: str):
         await websocket.accept()
-        self.active_connections.append(websocket)
+        self.active_connections[connection_id] = websocket
         # Record initial heartbeat
         self.last_heartbeat[connection_id] = datetime.now()
         # Send current state to the new connection
         await self.send_personal_message({"active_users": self.active_users}, websocket)
 
     def disconnect(self, websocket: WebSocket, connection_id: str = None):
-        if websocket in self.active_connections:
-            self.active_connections.remove(websocket)
+        if connection_id is not None:
+            self.active_connections.pop(connection_id, None)
+        else:
+            # Without an id, fall back to looking the socket up
+            for cid, connection in list(self.active_connections.items()):
+                if connection is websocket:
+                    del self.active_connections[cid]
 
         # Remove heartbeat record if connection_id is provided
         if connection_id and connection_id in self.last_heartbeat:
@@ -271,6 +448,62 @@ class ConnectionManager:
         """Record a heartbeat for the given connection"""
         self.last_heartbeat[connection_id] = datetime.now()
 
+    async def remove_connection(self, connection_id: str):
+        """
+        Forget a connection: drop its heartbeat and visitor mapping, remove the visitor's
+        data once their last connection is gone, and take them out of every app
+
+        Args:
+            connection_id: ID of the closed or stale connection
+        """
+        self.last_heartbeat.pop(connection_id, None)
+
+        visitor_id = self.connection_to_visitor.get(connection_id)
+        if visitor_id is None:
+            # Unidentified connection: it can only have joined apps under its connection id
+            for app in list(self.visitor_apps.get(connection_id, ())):
+                await self.remove_user_from_app(app, connection_id)
+            return
+
+        visitor = self.unique_visitors.get(visitor_id)
+        if visitor is not None and "connections" in visitor:
+            if connection_id in visitor["connections"]:
+                visitor["connections"].remove(connection_id)
+
+            # If this was the last connection for this visitor, clean up their data
+            if not visitor["connections"]:
+                self.visitor_tabs.pop(visitor_id, None)
+                self.visitor_browsers.pop(visitor_id, None)
+                self.visitor_platforms.pop(visitor_id, None)
+                self.visitor_device_labels.pop(visitor_id, None)
+                del self.unique_visitors[visitor_id]
+                self.invalidate_visitor_hierarchy()
+
+        # Once the visitor has no connections left, remove them from all apps
+        if visitor_id not in self.unique_visitors or not self.unique_visitors[visitor_id].get("connections"):
+            for app in list(self.visitor_apps.get(visitor_id, ())):
+                await self.remove_user_from_app(app, visitor_id)
+
+        # Now it's safe to remove the connection mapping
+        del self.connection_to_visitor[connection_id]
+
+    def schedule_presence_broadcast(self):
+        """
+        Broadcast presence once PRESENCE_BROADCAST_DELAY from now; further changes in the
+        meantime are folded into that same broadcast
+        """
+        self._presence_changed = True
+        if self._presence_broadcast_task is None or self._presence_broadcast_task.done():
+            self._presence_broadcast_task = asyncio.create_task(self._flush_presence_broadcast())
+
+    async def _flush_presence_broadcast(self):
+        # Changes made while a broadcast is being sent mark presence as changed again,
+        # so keep going until a broadcast has gone out after the last change
+        while self._presence_changed:
+            await asyncio.sleep(PRESENCE_BROADCAST_DELAY)
+            self._presence_changed = False
+            await broadcast_presence()
+
     async def cleanup_stale_connections(self):
         """Check for stale connections and clean them up"""
         now = datetime.now()
@@ -284,87 +517,60 @@ class ConnectionManager:
         # Clean up stale connections
         for connection_id in stale_connections:
             api_logger.info(f"Cleaning up stale connection: {connection_id}")
-
-            # Remove from last_heartbeat
-            if connection_id in self.last_heartbeat:
-                del self.last_heartbeat[connection_id]
-
-            # If we have a visitor ID for this connection, update their data
-            if connection_id in self.connection_to_visitor:
-                visitor_id = self.connection_to_visitor[connection_id]
-                if visitor_id in self.unique_visitors and "connections" in self.unique_visitors[visitor_id]:
-                    if connection_id in self.unique_visitors[visitor_id]["connections"]:
-                        self.unique_visitors[visitor_id]["connections"].remove(connection_id)
-
-                    # If this was the last connection for this visitor, clean up their data
-                    if len(self.unique_visitors[visitor_id]["connections"]) == 0:
-                        # Remove tabs for this visitor
-                        if visitor_id in self.visitor_tabs:
-                            del self.visitor_tabs[visitor_id]
-
-                        # Remove browsers for this visitor
-                        if visitor_id in self.visitor_browsers:
-                            del self.visitor_browsers[visitor_id]
-
-                        # Remove platform info for this visitor
-                        if visitor_id in self.visitor_platforms:
-                            del self.visitor_platforms[visitor_id]
-
-                        # Remove visitor from all apps (unique visitor tracking)
-                        for app_name, vset in self.app_visitors.items():
-                            if visitor_id in vset:
-                                vset.remove(visitor_id)
-                                # Sync list representation
-                                self.active_users[app_name] = list(vset)
-                        # Remove visitor from unique_visitors
-                        del self.unique_visitors[visitor_id]
-
-                # Remove the connection mapping
-                del self.connection_to_visitor[connection_id]
-
-            # Remove the user from all apps
-            for app in self.active_users:
-                if connection_id in self.active_users[app]:
-                    self.active_users[app].remove(connection_id)
+            await self.remove_connection(connection_id)
 
         # If we cleaned up any connections, broadcast the updated state
         if stale_connections:
-            await broadcast_presence()
-
-    async def broadcast(self, message: dict):
-        # Add total active users and unique visitors to the message
-        message["total_active_users"] = sum(len(users) for users in self.active_users.values())
-        message["unique_visitors"] = len(self.unique_visitors)
+            self.schedule_presence_broadcast()
 
-        # Add browser and tab statistics if available
-        browsers_count = sum(len(browsers) for browsers in self.visitor_browsers.values())
-        tabs_count = sum(len(tabs) for tabs in self.visitor_tabs.values())
-        message["browser_count"] = browsers_count
-        message["tab_count"] = tabs_count
-
-        # Add visitor hierarchy data for the diagram
-        message["visitor_hierarchy"] = self.get_visitor_hierarchy()
+    def _presence_snapshot(self) -> dict:
+        """Return the active user, visitor, browser and tab totals and the visitor hierarchy"""
+        # Rebuilding the hierarchy (when stale) also refreshes the browser and tab totals
+        visitor_hierarchy = self.get_visitor_hierarchy()
+        return {
+            "total_active_users": self._total_active_users,
+            "unique_visitors": len(self.unique_visitors),
+            "browser_count": self._browser_count,
+            "tab_count": self._tab_count,
+            "visitor_hierarchy": visitor_hierarchy,
+        }
 
-        for connection in self.active_connections:
-            await connection.send_json(message)
+    async def broadcast(self, message: dict):
+        # Serialize once for all clients, then send concurrently; snapshot the list since sends can yield
+        payload = orjson.dumps({**message, **self._presence_snapshot()}).decode()
+        connections = list(self.active_connections.items())
+        results = await asyncio.gather(
+            *(connection.send_text(payload) for _, connection in connections),
+            return_exceptions=True
+        )
+        for (connection_id, _), result in zip(connections, results):
+            if isinstance(result, Exception):
+                # The client went away mid-send; its handler finishes the cleanup
+                api_logger.info(f"Dropping websocket {connection_id} after failed send: {str(result)}")
+                self.active_connections.pop(connection_id, None)
 
     async def send_personal_message(self, message: dict, websocket: WebSocket):
-        # Add total active users and unique visitors to the message
-        message["total_active_users"] = sum(len(users) for users in self.active_users.values())
-        message["unique_visitors"] = len(self.unique_visitors)
-
-        # Add browser and tab statistics if available
-        browsers_count = sum(len(browsers) for browsers in self.visitor_browsers.values())
-        tabs_count = sum(len(tabs) for tabs in self.visitor_tabs.values())
-        message["browser_count"] = browsers_count
-        message["tab_count"] = tabs_count
+        await websocket.send_text(orjson.dumps({**message, **self._presence_snapshot()}).decode())
 
-        # Add visitor hierarchy data for the diagram
-        message["visitor_hierarchy"] = self.get_visitor_hierarchy()
-
-        await websocket.send_json(message)
+    def invalidate_visitor_hierarchy(self):
+        """Mark the cached visitor hierarchy as stale after visitor, browser or tab data changed"""
+        self._hierarchy_dirty = True
 
     def get_visitor_hierarchy(self):
+        """
+        Return the visitor hierarchy, rebuilding it only when visitor data has changed
+
+        Returns:
+            dict: A hierarchical data structure with visitors, devices, browsers, and tabs
+        """
+        if self._hierarchy_dirty or self._hierarchy_cache is None:
+            self._hierarchy_cache = self._build_visitor_hierarchy()
+            self._browser_count = sum(len(browsers) for browsers in self.visitor_browsers.values())
+            self._tab_count = sum(len(tabs) for tabs in self.visitor_tabs.values())
+            self._hierarchy_dirty = False
+        return self._hierarchy_cache
+
+    def _build_visitor_hierarchy(self):
         """
         Generate a hierarchical data structure for visualization
 
@@ -378,174 +584,87 @@ class ConnectionManager:
             "children": []
         }
 
-        # Group visitors by platform (device type)
-        platforms = {}
+        # Platform and browser nodes are built in place; these map names to the nodes already added
+        platform_nodes: Dict[str, dict] = {}
+        browser_nodes: Dict[Tuple[str, str], dict] = {}
 
         for visitor_id, visitor_data in self.unique_visitors.items():
             # Get all browsers used by this visitor
-            browsers = self.visitor_browsers.get(visitor_id, set())
+            browsers = self.visitor_browsers.get(visitor_id, ())
+            tabs = self.visitor_tabs.get(visitor_id, ())
+
+            device_labels = self.visitor_device_labels.get(visitor_id, {})
 
             for browser in browsers:
-                # Get platform information from stored data
-                platform = "Unknown"
-
-                # Check if we have platform information for this browser
-                if visitor_id in self.visitor_platforms and browser in self.visitor_platforms[visitor_id]:
-                    platform_info = self.visitor_platforms[visitor_id][browser]
-
-                    # Use platform information to determine device type
-                    if platform_info == "iPhone":
-                        platform = "iPhone"
-                    elif platform_info == "iPad":
-                        platform = "Tablet"
-                    elif "Mac" in platform_info:
-                        platform = "Laptop"
-                    elif "Win" in platform_info:
-                        platform = "PC"
-                    elif "Android" in platform_info:
-                        platform = "Android Phone"
-                    else:
-                        # Check user agent for additional clues
-                        if visitor_id in self.visitor_platforms and "user_agents" in self.visitor_platforms[visitor_id] and browser in self.visitor_platforms[visitor_id]["user_agents"]:
-                            user_agent = self.visitor_platforms[visitor_id]["user_agents"][browser]
-
-                            if "iPhone" in user_agent:
-                                platform = "iPhone"
-                            elif "iPad" in user_agent:
-                                platform = "Tablet"
-                            elif "Android" in user_agent:
-                                platform = "Android Phone"
-                            elif "Mobile" in user_agent:
-                                platform = "Mobile"
-                            elif "Windows" in user_agent:
-                                platform = "PC"
-                            elif "Macintosh" in user_agent:
-                                platform = "Laptop"
-                            else:
-                                # Fallback to browser-based detection
-                                if "Mobile" in browser or "Android" in browser or "iPhone" in browser or "iPad" in browser:
-                                    if "iPad" in browser:
-                                        platform = "Tablet"
-                                    elif "iPhone" in browser:
-                                        platform = "iPhone"
-                                    elif "Android" in browser:
-                                        platform = "Android Phone"
-                                    else:
-                                        platform = "Mobile"
-                                elif "Windows" in browser:
-                                    platform = "PC"
-                                elif "Mac" in browser or "Safari" in browser:
-                                    platform = "Laptop"
-                                else:
-                                    platform = "Other"
-                        else:
-                            # Fallback to browser-based detection
-                            if "Mobile" in browser or "Android" in browser or "iPhone" in browser or "iPad" in browser:
-                                if "iPad" in browser:
-                                    platform = "Tablet"
-                                elif "iPhone" in browser:
-                                    platform = "iPhone"
-                                elif "Android" in browser:
-                                    platform = "Android Phone"
-                                else:
-                                    platform = "Mobile"
-                            elif "Windows" in browser:
-                                platform = "PC"
-                            elif "Mac" in browser or "Safari" in browser:
-                                platform = "Laptop"
-                            else:
-                                platform = "Other"
-                else:
-                    # Fallback to browser-based detection
-                    if "Mobile" in browser or "Android" in browser or "iPhone" in browser or "iPad" in browser:
-                        if "iPad" in browser:
-                            platform = "Tablet"
-                        elif "iPhone" in browser:
-                            platform = "iPhone"
-                        elif "Android" in browser:
-                            platform = "Android Phone"
-                        else:
-                            platform = "Mobile"
-                    elif "Windows" in browser:
-                        platform = "PC"
-                    elif "Mac" in browser or "Safari" in browser:
-                        platform = "Laptop"
-                    else:
-                        platform = "Other"
-
-                # Add to platforms dictionary
-                if platform not in platforms:
-                    platforms[platform] = {
-                        "name": platform,
-                        "value": 0,
-                        "children": {}
-                    }
-
-                # Increment count for this platform
-                platforms[platform]["value"] += 1
-
-                # Add browser to this platform if not already present
-                if browser not in platforms[platform]["children"]:
-                    platforms[platform]["children"][browser] = {
-                        "name": browser,
-                        "value": 0,
-                        "children": []
-                    }
-
-                # Increment count for this browser
-                platforms[platform]["children"][browser]["value"] += 1
+                # Device type classified when the visitor identified; classify now if it is missing
+                platform = device_labels.get(browser)
+                if platform is None:
+                    platform_info = self.visitor_platforms.get(visitor_id, {})
+                    platform = _classify_device(platform_info.get(browser),
+                                                platform_info.get("user_agents", {}).get(browser), browser)
+
+                platform_node = platform_nodes.get(platform)
+                if platform_node is None:
+                    platform_node = platform_nodes[platform] = {"name": platform, "value": 0, "children": []}
+                    hierarchy["children"].append(platform_node)
+                platform_node["value"] += 1
+
+                browser_node = browser_nodes.get((platform, browser))
+                if browser_node is None:
+                    browser_node = browser_nodes[(platform, browser)] = {"name": browser, "value": 0, "children": []}
+                    platform_node["children"].append(browser_node)
+                browser_node["value"] += 1
 
                 # Add tabs for this visitor and browser
-                tabs = self.visitor_tabs.get(visitor_id, set())
-                for tab in tabs:
-                    platforms[platform]["children"][browser]["children"].append({
-                        "name": f"Tab {tab[:8]}...",
-                        "value": 1
-                    })
-
-        # Convert the platforms dictionary to a list for the hierarchy
-        for platform, platform_data in platforms.items():
-            platform_node = {
-                "name": f"{platform} ({platform_data['value']} Users)",
-                "value": platform_data["value"],
-                "children": []
-            }
+                browser_node["children"].extend({"name": f"Tab {tab[:8]}...", "value": 1} for tab in tabs)
 
-            # Add browsers as children of the platform
-            for browser, browser_data in platform_data["children"].items():
-                browser_node = {
-                    "name": f"{browser} ({browser_data['value']} Users)",
-                    "value": browser_data["value"],
-                    "children": browser_data["children"]
-                }
-                platform_node["children"].append(browser_node)
-
-            hierarchy["children"].append(platform_node)
+        # Labels carry the final counts, so they are filled in once counting is done
+        for node in platform_nodes.values():
+            node["name"] = f"{node['name']} ({node['value']} Users)"
+        for node in browser_nodes.values():
+            node["name"] = f"{node['name']} ({node['value']} Users)"
 
         return hierarchy
 
-    async def add_user_to_app(self, app: str, visitor_id: str):
+    def _sync_active_users(self, app: str):
+        """Refresh the active_users list of an app from its visitor set and adjust the running total"""
+        users = list(self.app_visitors[app])
+        self._total_active_users += len(users) - len(self.active_users.get(app, ()))
+        self.active_users[app] = users
+
+    async def add_user_to_app(self, app: str, visitor_id: str) -> bool:
+        """Add a visitor to an app; returns True (and schedules a broadcast) only if they were not in it yet"""
         # Ensure structures exist for the app
         if app not in self.app_visitors:
             self.app_visitors[app] = set()
         if app not in self.active_users:
             self.active_users[app] = []
+        # Nothing changes on a repeated join
+        if visitor_id in self.app_visitors[app]:
+            return False
         # Add visitor to the app's unique visitor set
-        before_count = len(self.app_visitors[app])
         self.app_visitors[app].add(visitor_id)
+        self.visitor_apps.setdefault(visitor_id, set()).add(app)
         # Keep active_users list in sync (for frontend consumption)
-        self.active_users[app] = list(self.app_visitors[app])
-        # Only broadcast if there was a change in unique visitors
-        if len(self.app_visitors[app]) != before_count:
-            await self.broadcast({"active_users": self.active_users})
+        self._sync_active_users(app)
+        self.schedule_presence_broadcast()
+        return True
 
-    async def remove_user_from_app(self, app: str, visitor_id: str):
+    async def remove_user_from_app(self, app: str, visitor_id: str) -> bool:
+        """Remove a visitor from an app; returns True (and schedules a broadcast) only if they were in it"""
         # Remove from authoritative set if present
         if app in self.app_visitors and visitor_id in self.app_visitors[app]:
             self.app_visitors[app].remove(visitor_id)
+            apps = self.visitor_apps.get(visitor_id)
+            if apps is not None:
+                apps.discard(app)
+                if not apps:
+                    del self.visitor_apps[visitor_id]
             # Sync list representation
-            self.active_users[app] = list(self.app_visitors[app])
-            await self.broadcast({"active_users": self.active_users})
+            self._sync_active_users(app)
+            self.schedule_presence_broadcast()
+            return True
+        return False
 
 # Initialize connection manager
 manager = ConnectionManager()
@@ -562,8 +681,7 @@ async def root():
     Root endpoint that serves the selection.html file
     """
     api_logger.info("Serving selection.html")
-    with open("src/static/selection.html", encoding="utf-8") as f:
-        return f.read()
+    return FileResponse("src/static/selection.html", media_type="text/html")
 
 @api.get("/access-closed", response_class=HTMLResponse)
 async def access_closed():
@@ -595,8 +713,7 @@ async def excel_formatter():
     Endpoint that serves the Excel Formatter application (index.html)
     """
     api_logger.info("Serving Excel Formatter (index.html)")
-    with open("src/static/index.html", encoding="utf-8") as f:
-        return f.read()
+    return FileResponse("src/static/index.html", media_type="text/html")
 
 @api.get("/pricing", response_class=HTMLResponse)
 async def retail_pricing():
@@ -604,8 +721,7 @@ async def retail_pricing():
     Endpoint that serves the Retail Pricing Calculator (pricing.html)
     """
     api_logger.info("Serving Retail Pricing Calculator (pricing.html)")
-    with open("src/static/pricing.html", encoding="utf-8") as f:
-        return f.read()
+    return FileResponse("src/static/pricing.html", media_type="text/html")
 
 @api.get("/pricing/slabs", response_class=HTMLResponse)
 async def retail_pricing_slabs():
@@ -616,8 +732,7 @@ async def retail_pricing_slabs():
     filepath = "src/static/slabs.html"
     if not os.path.exists(filepath):
         raise HTTPException(status_code=404, detail="SLABs page not found")
-    with open(filepath, encoding="utf-8") as f:
-        return f.read()
+    return FileResponse(filepath, media_type="text/html")
 
 # Helper to mask client IPs for privacy-safe display
 
@@ -646,39 +761,16 @@ async def resolve_net_name(visitor_id: str, ip: str):
         # Basic sanity check
         if host and host != ip and not host.endswith(".in-addr.arpa"):
             manager.visitor_nets[visitor_id] = host
-            await broadcast_presence()
+            manager.schedule_presence_broadcast()
     except Exception:
         # Ignore resolution errors/timeouts
         pass
 
 # Broadcast richer presence payload to all WS clients
-async def broadcast_presence():
-    try:
-        payload = {
-            "type": "presence",
-            "apps": {app: list(vset) for app, vset in manager.app_visitors.items()},
-            "visitors": [
-                {
-                    "visitorId": vid,
-                    "ip": manager.visitor_ips.get(vid, ""),
-                    "browsers": list(manager.visitor_browsers.get(vid, [])),
-                    "tabs": len(manager.visitor_tabs.get(vid, [])),
-                    "deviceType": manager.visitor_device.get(vid, {}).get("deviceType", ""),
-                    "deviceModel": manager.visitor_device.get(vid, {}).get("model", ""),
-                    "os": manager.visitor_device.get(vid, {}).get("os", ""),
-                    "net": manager.visitor_nets.get(vid, ""),
-                }
-                for vid in manager.unique_visitors.keys()
-            ],
-        }
-        await manager.broadcast(payload)
-    except Exception as e:
-        api_logger.error(f"presence broadcast error: {e}")
-
-# Presence snapshot endpoint (optional)
-@api.get("/presence")
-async def presence():
-    return JSONResponse({
+def presence_payload() -> dict:
+    """Build the presence message describing every app's visitors and every visitor's devices"""
+    return {
+        "type": "presence",
         "apps": {app: list(vset) for app, vset in manager.app_visitors.items()},
         "visitors": [
             {
@@ -693,7 +785,25 @@ async def presence():
             }
             for vid in manager.unique_visitors.keys()
         ],
-    })
+    }
+
+async def broadcast_presence():
+    try:
+        # active_users rides along for clients that read it instead of the presence fields
+        await manager.broadcast({**presence_payload(), "active_users": manager.active_users})
+    except Exception as e:
+        api_logger.error(f"presence broadcast error: {e}")
+
+# Presence snapshot endpoint (optional)
+@api.get("/presence")
+async def presence():
+    # Same snapshot the WebSocket broadcast carries, without the message type
+    payload = presence_payload()
+    del payload["type"]
+    return ORJSONResponse(payload)
+
+# Heartbeat reply, encoded once
+PONG_MESSAGE = orjson.dumps({"action": "pong"}).decode()
 
 @api.websocket("/ws/app-status")
 async def websocket_app_status(websocket: WebSocket):
@@ -715,10 +825,6 @@ async def websocket_app_status(websocket: WebSocket):
         except Exception:
             client_ip = None
 
-        # Start background task to clean up stale connections
-        background_tasks = BackgroundTasks()
-        background_tasks.add_task(cleanup_stale_connections_task)
-
         while True:
             # Wait for messages from the client with a timeout
             try:
@@ -733,7 +839,7 @@ async def websocket_app_status(websocket: WebSocket):
                     # Handle heartbeat
                     if data["action"] == "heartbeat":
                         # Send a pong response
-                        await websocket.send_json({"action": "pong"})
+                        await websocket.send_text(PONG_MESSAGE)
                         continue
 
                     # Handle visitor identification
@@ -745,14 +851,18 @@ async def websocket_app_status(websocket: WebSocket):
                         # Store the mapping from connection to visitor
                         manager.connection_to_visitor[connection_id] = visitor_id
 
+                        # Track whether anything other clients can see has changed
+                        state_changed = False
+
                         # Add or update visitor information
                         if visitor_id not in manager.unique_visitors:
+                            state_changed = True
                             manager.unique_visitors[visitor_id] = {
                                 "first_seen": datetime.now().isoformat(),
                                 "connections": [connection_id]
                             }
-                            manager.visitor_browsers[visitor_id] = set()
-                            manager.visitor_tabs[visitor_id] = set()
+                            manager.visitor_browsers[visitor_id] = BoundedSet(MAX_BROWSERS_PER_VISITOR)
+                            manager.visitor_tabs[visitor_id] = BoundedSet(MAX_TABS_PER_VISITOR)
                             manager.visitor_platforms[visitor_id] = {}
                         else:
                             if connection_id not in manager.unique_visitors[visitor_id]["connections"]:
@@ -761,7 +871,9 @@ async def websocket_app_status(websocket: WebSocket):
                         # Update browser information if available
                         if browser_info and "browser" in browser_info:
                             browser_name = browser_info["browser"]
-                            manager.visitor_browsers[visitor_id].add(browser_name)
+                            if browser_name not in manager.visitor_browsers[visitor_id]:
+                                state_changed = True
+                                manager.visitor_browsers[visitor_id].add(browser_name)
 
                             # Store platform information
                             if "platform" in browser_info:
@@ -775,25 +887,44 @@ async def websocket_app_status(websocket: WebSocket):
                                     manager.visitor_platforms[visitor_id]["user_agents"] = {}
                                 manager.visitor_platforms[visitor_id]["user_agents"][browser_name] = user_agent
 
+                            # Classify the device once here instead of on every hierarchy rebuild
+                            platform_info = manager.visitor_platforms[visitor_id]
+                            device_label = _classify_device(
+                                platform_info.get(browser_name),
+                                platform_info.get("user_agents", {}).get(browser_name),
+                                browser_name
+                            )
+                            device_labels = manager.visitor_device_labels.setdefault(visitor_id, {})
+                            if device_labels.get(browser_name) != device_label:
+                                state_changed = True
+                                device_labels[browser_name] = device_label
+
                             # Store device info (type and OS) if provided by client
                             dev_type = browser_info.get("deviceType") or browser_info.get("device_type")
                             os_name = browser_info.get("os") or browser_info.get("osName") or browser_info.get("os_name")
                             dev_model = browser_info.get("deviceModel") or browser_info.get("device_model")
                             if dev_type or os_name or dev_model:
-                                manager.visitor_device[visitor_id] = {
+                                device = {
                                     "deviceType": dev_type or "",
                                     "os": os_name or "",
                                     "model": dev_model or "",
                                 }
+                                if manager.visitor_device.get(visitor_id) != device:
+                                    state_changed = True
+                                    manager.visitor_device[visitor_id] = device
 
                         # Update tab information
-                        if tab_id:
+                        if tab_id and tab_id not in manager.visitor_tabs[visitor_id]:
+                            state_changed = True
                             manager.visitor_tabs[visitor_id].add(tab_id)
 
                         # Store masked IP for this visitor and resolve net name asynchronously
                         try:
                             if client_ip:
-                                manager.visitor_ips[visitor_id] = mask_ip(client_ip)
+                                masked_ip = mask_ip(client_ip)
+                                if manager.visitor_ips.get(visitor_id) != masked_ip:
+                                    state_changed = True
+                                    manager.visitor_ips[visitor_id] = masked_ip
                                 # Kick off best-effort reverse lookup for network/host name
                                 try:
                                     asyncio.create_task(resolve_net_name(visitor_id, client_ip))
@@ -804,8 +935,13 @@ async def websocket_app_status(websocket: WebSocket):
 
                         api_logger.info(f"Identified visitor: {visitor_id} using {browser_info.get('browser', 'unknown')} browser, tab: {tab_id}")
 
-                        # Broadcast updated presence stats
-                        await broadcast_presence()
+                        if state_changed:
+                            # Broadcast updated presence stats
+                            manager.invalidate_visitor_hierarchy()
+                            manager.schedule_presence_broadcast()
+                        else:
+                            # Nothing new for the other clients; just bring this connection up to date
+                            await manager.send_personal_message(presence_payload(), websocket)
 
                     # Handle app actions if app is specified
                     elif "app" in data:
@@ -813,15 +949,14 @@ async def websocket_app_status(websocket: WebSocket):
                         # Resolve visitor id robustly
                         vid = data.get("visitorId") or visitor_id or manager.connection_to_visitor.get(connection_id) or connection_id
 
+                        # A broadcast is scheduled only when the join/leave actually changed the app
                         if data["action"] == "join":
                             await manager.add_user_to_app(app, vid)
                             api_logger.info(f"User {vid} joined {app}")
-                            await broadcast_presence()
 
                         elif data["action"] == "leave":
                             await manager.remove_user_from_app(app, vid)
                             api_logger.info(f"User {vid} left {app}")
-                            await broadcast_presence()
 
             except asyncio.TimeoutError:
                 # Connection timed out, check if it's still active
@@ -844,83 +979,37 @@ async def websocket_app_status(websocket: WebSocket):
     finally:
         # Clean up when the connection is closed
         manager.disconnect(websocket, connection_id)
+        await manager.remove_connection(connection_id)
 
-        # Determine visitor id for this connection early (before we delete the mapping)
-        vid_to_remove = manager.connection_to_visitor.get(connection_id) if connection_id in manager.connection_to_visitor else None
-
-        # If we have a visitor ID for this connection, update their data
-        if vid_to_remove is not None:
-            visitor_id = vid_to_remove
-            if visitor_id in manager.unique_visitors and "connections" in manager.unique_visitors[visitor_id]:
-                if connection_id in manager.unique_visitors[visitor_id]["connections"]:
-                    manager.unique_visitors[visitor_id]["connections"].remove(connection_id)
-
-                # If this was the last connection for this visitor, clean up their data
-                if len(manager.unique_visitors[visitor_id]["connections"]) == 0:
-                    # Remove tabs for this visitor
-                    if visitor_id in manager.visitor_tabs:
-                        del manager.visitor_tabs[visitor_id]
-
-                    # Remove browsers for this visitor
-                    if visitor_id in manager.visitor_browsers:
-                        del manager.visitor_browsers[visitor_id]
-
-                    # Remove platform info for this visitor
-                    if visitor_id in manager.visitor_platforms:
-                        del manager.visitor_platforms[visitor_id]
-
-                    # Remove visitor from unique_visitors
-                    del manager.unique_visitors[visitor_id]
-
-        # Remove the user from all apps. If this was the last connection for this visitor, remove their visitor_id from apps.
-        last_conn = False
-        if vid_to_remove is None:
-            # Fallback: we can only remove by connection id (in case join used connection id)
-            for app in manager.active_users:
-                if connection_id in manager.active_users[app]:
-                    await manager.remove_user_from_app(app, connection_id)
-        else:
-            # If visitor entry no longer exists or has zero connections, it's the last
-            if vid_to_remove not in manager.unique_visitors:
-                last_conn = True
-            else:
-                if len(manager.unique_visitors[vid_to_remove].get("connections", [])) == 0:
-                    last_conn = True
-            if last_conn:
-                for app in list(manager.app_visitors.keys()):
-                    await manager.remove_user_from_app(app, vid_to_remove)
-
-        # Now it's safe to remove the connection mapping
-        if connection_id in manager.connection_to_visitor:
-            del manager.connection_to_visitor[connection_id]
-
-        await broadcast_presence()
+        manager.schedule_presence_broadcast()
         api_logger.info(f"WebSocket connection closed: {connection_id}")
 
+# Each connection's receive loop times out on its own after heartbeat_timeout of silence
+# and cleans itself up, so the sweep is only a safety net for connections that slipped past it
+STALE_CONNECTION_SWEEP_INTERVAL = 300  # seconds
+
 # Background task to clean up stale connections
 async def cleanup_stale_connections_task():
     """Background task to periodically clean up stale connections"""
     while True:
+        await asyncio.sleep(STALE_CONNECTION_SWEEP_INTERVAL)
+
         try:
             await manager.cleanup_stale_connections()
         except Exception as e:
             error_logger.error(f"Error cleaning up stale connections: {str(e)}")
 
-        # Wait for 30 seconds before checking again
-        await asyncio.sleep(30)
-
 @api.get("/logs", response_class=HTMLResponse)
 async def logs_page():
     """
     Endpoint that serves the logs.html file
     """
     api_logger.info("Serving logs.html")
-    try:
-        with open("src/static/logs.html", encoding="utf-8") as f:
-            return f.read()
-    except FileNotFoundError:
+    filepath = "src/static/logs.html"
+    if not os.path.exists(filepath):
         error_logger.error("logs.html not found")
         raise HTTPException(status_code=404, detail="Logs page not found")
+    return FileResponse(filepath, media_type="text/html")
 
 @api.get("/api/logs")
 async def get_logs(limit: int = None):
@@ -939,6 +1028,46 @@ async def get_logs(limit: int = None):
         error_logger.error(error_msg)
         raise HTTPException(status_code=500, detail=error_msg)
 
+# Short-lived cache for /api/logs/stats so dashboard polling does not re-read and re-aggregate logs.
+# It is only read and written on the event loop, between awaits, so it needs no lock
+LOG_STATS_CACHE_TTL = 5  # seconds
+LOG_STATS_CACHE_MAX_ENTRIES = 64
+log_stats_cache: Dict[tuple, tuple] = {}
+# Statistics being computed, so concurrent requests for the same key share one computation
+log_stats_inflight: Dict[tuple, asyncio.Task] = {}
+
+def compute_log_stats(log_type: str, days: int, start_date: Optional[str], end_date: Optional[str], limit: Optional[int]):
+    """
+    Read the logs and aggregate them into statistics (blocking; run it in a worker thread)
+    """
+    # Only read the requested log type and the files touched inside the window
+    if start_date and end_date:
+        since = datetime.strptime(start_date, '%Y-%m-%d')
+    else:
+        since = datetime.now() - timedelta(days=days)
+    types = None if log_type == 'all' else [log_type]
+    logs = get_all_logs(max_entries=limit, types=types, since=since)
+
+    # Process logs for statistics
+    return process_logs_for_stats(logs, log_type, days, start_date, end_date)
+
+def store_log_stats(cache_key: tuple, task: asyncio.Task):
+    """
+    Cache the result of a finished log stats computation (done callback of its task)
+    """
+    log_stats_inflight.pop(cache_key, None)
+    if task.cancelled() or task.exception() is not None:
+        return
+
+    # Drop expired entries, then the oldest one if the cache is still full
+    now = time.monotonic()
+    if len(log_stats_cache) >= LOG_STATS_CACHE_MAX_ENTRIES:
+        for key in [k for k, (t, _) in log_stats_cache.items() if now - t >= LOG_STATS_CACHE_TTL]:
+            del log_stats_cache[key]
+        if len(log_stats_cache) >= LOG_STATS_CACHE_MAX_ENTRIES:
+            del log_stats_cache[next(iter(log_stats_cache))]
+    log_stats_cache[cache_key] = (now, task.result())
+
 @api.get("/api/logs/stats")
 async def get_log_stats(
     log_type: str = 'all',
@@ -962,26 +1091,134 @@ async def get_log_stats(
     """
     api_logger.info(f"Retrieving log statistics: type={log_type}, days={days}, start_date={start_date}, end_date={end_date}")
     try:
-        # Get logs
-        logs = get_all_logs(max_entries=limit)
-
-        # Process logs for statistics
-        stats = process_logs_for_stats(logs, log_type, days, start_date, end_date)
-
-        return stats
+        cache_key = (log_type, days, start_date, end_date, limit)
+        cached = log_stats_cache.get(cache_key)
+        if cached and time.monotonic() - cached[0] < LOG_STATS_CACHE_TTL:
+            return cached[1]
+
+        # Read and aggregate in a worker thread, joining a computation already under way for this key
+        task = log_stats_inflight.get(cache_key)
+        if task is None:
+            task = asyncio.ensure_future(asyncio.to_thread(compute_log_stats, log_type, days, start_date, end_date, limit))
+            log_stats_inflight[cache_key] = task
+            task.add_done_callback(lambda done: store_log_stats(cache_key, done))
+
+        # Shielded, so a client that goes away does not cancel the computation for the others
+        return await asyncio.shield(task)
     except Exception as e:
         error_msg = f"Error retrieving log statistics: {str(e)}"
         error_logger.error(error_msg)
         raise HTTPException(status_code=500, detail=error_msg)
 
+UPLOAD_COPY_CHUNK_SIZE = 1024 * 1024  # 1 MiB
+# Starlette spools uploads up to this size in memory (MultiPartParser.spool_max_size)
+UPLOAD_SPOOL_MAX_SIZE = 1024 * 1024
+
+def open_data_file(file_path: str):
+    """
+    Open a new file in a data folder for writing, recreating the folder if
+    clear_data_folders has just swapped it out
+    """
+    for _ in range(3):
+        try:
+            return open(file_path, "wb")
+        except FileNotFoundError:
+            os.makedirs(os.path.dirname(file_path), exist_ok=True)
+    return open(file_path, "wb")
+
+def save_upload_file(source, file_path: str):
+    """
+    Copy an uploaded file object to disk (blocking; run it in a worker thread)
+
+    Uploads small enough to still be held in memory are written in a single call; uploads
+    already spooled to disk are copied in the kernel with os.copy_file_range where available.
+    """
+    with open_data_file(file_path) as buffer:
+        if isinstance(source, tempfile.SpooledTemporaryFile):
+            # Only the public file API is used (checked against CPython 3.11): fileno() would
+            # roll an in-memory spool over to disk, so small uploads are read and written directly
+            start = source.tell()
+            source.seek(0, os.SEEK_END)
+            size = source.tell() - start
+            source.seek(start)
+            if size <= UPLOAD_SPOOL_MAX_SIZE:
+                buffer.write(source.read())
+                return
+
+        if hasattr(os, "copy_file_range"):
+            start = source.tell()
+            try:
+                source.flush()
+                offset = start
+                while True:
+                    copied = os.copy_file_range(source.fileno(), buffer.fileno(), UPLOAD_COPY_CHUNK_SIZE, offset)
+                    if not copied:
+                        return
+                    offset += copied
+            except (OSError, AttributeError, io.UnsupportedOperation):
+                # Not supported for this file/filesystem: start over with a plain copy
+                source.seek(start)
+                buffer.seek(0)
+                buffer.truncate()
+
+        shutil.copyfileobj(source, buffer, UPLOAD_COPY_CHUNK_SIZE)
+
+EXCEL_SUFFIXES = {'.xls', '.xlsx'}
+
+# Column metadata of uploaded files, filled in by a background task once the upload has returned.
+# Entries expire UPLOAD_METADATA_TTL after they are ready; only the event loop touches this dict
+UPLOAD_METADATA_TTL = 600  # seconds
+upload_metadata: Dict[str, Dict[str, Any]] = {}
+
+def read_upload_metadata(file_path: str) -> Dict[str, Any]:
+    """
+    Read the column names, mapping suggestions and unique values of an uploaded Excel file (blocking)
+    """
+    column_names, unique_values, row_count = read_excel_summary(file_path)
+    rows = row_count if row_count is not None else "an unknown number of"
+    data_logger.info(f"Read Excel file with {rows} rows and {len(column_names)} columns")
+
+    # Get suggestions for column mapping based on previous mappings
+    suggestions = get_suggestions(column_names)
+    data_logger.info(f"Generated {len(suggestions)} column mapping suggestions")
+    data_logger.info(f"Extracted unique values for {len(unique_values)} columns")
+
+    return {"column_names": column_names, "suggestions": suggestions, "unique_values": unique_values}
+
+def expire_upload_metadata(filename: str, metadata: Dict[str, Any]):
+    """
+    Drop the metadata of an upload once its TTL has passed, unless it has been replaced since
+    """
+    if upload_metadata.get(filename) is metadata:
+        del upload_metadata[filename]
+
+async def analyze_uploaded_excel(filename: str, file_path: str):
+    """
+    Read the column metadata of an uploaded Excel file into upload_metadata (runs as a background task)
+    """
+    try:
+        metadata = {"status": "ready", **await asyncio.to_thread(read_upload_metadata, file_path)}
+    except Exception as e:
+        error_msg = f"Error reading column names: {str(e)}"
+        error_logger.error(error_msg)
+        metadata = {"status": "error", "detail": error_msg, "column_names": [], "suggestions": {}, "unique_values": {}}
+    upload_metadata[filename] = metadata
+    asyncio.get_running_loop().call_later(UPLOAD_METADATA_TTL, expire_upload_metadata, filename, metadata)
+
 @api.post("/upload/")
-async def upload_file(file: UploadFile = File(...)):
+async def upload_file(background_tasks: BackgroundTasks, file: UploadFile = File(...)):
     """
     Upload an Excel file for processing
+
+    The response returns as soon as the file is on disk; column names, suggestions and
+    unique values are read in the background and served by /upload-meta/{filename}.
     """
     api_logger.info(f"Received file upload: {file.filename}")
 
-    if not file.filename.endswith(('.xls', '.xlsx')):
+    # Keep only the final path component (client paths may use either separator), so names
+    # like "../foo.xlsx" cannot escape the uploads folder
+    safe_name = PureWindowsPath(file.filename or "").name
+    if PureWindowsPath(safe_name).suffix.lower() not in EXCEL_SUFFIXES:
         error_msg = f"Invalid file type: {file.filename}"
         error_logger.warning(error_msg)
         raise HTTPException(status_code=400, detail="Only Excel files (.xls, .xlsx) are allowed")
@@ -989,41 +1226,48 @@ async def upload_file(file: UploadFile = File(...)):
     # Generate a unique filename
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
     unique_id = str(uuid.uuid4())[:8]
-    filename = f"{timestamp}_{unique_id}_{file.filename}"
-    file_path = os.path.join("src/data/uploads", filename)
+    filename = f"{timestamp}_{unique_id}_{safe_name}"
+    file_path = os.path.join(UPLOADS_DIR, filename)
 
     # Save the uploaded file
     try:
-        with open(file_path, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
+        await asyncio.to_thread(save_upload_file, file.file, file_path)
+        invalidate_files_count()
         api_logger.info(f"File saved to {file_path}")
     except Exception as e:
         error_msg = f"Error saving file: {str(e)}"
         error_logger.error(error_msg)
         raise HTTPException(status_code=500, detail=error_msg)
 
-    # Read the Excel file to get column names
-    from src.data.etl import read_excel, get_unique_column_values
-    try:
-        df = read_excel(file_path)
-        column_names = df.columns.tolist()
-        data_logger.info(f"Read Excel file with {len(df)} rows and {len(column_names)} columns")
+    # Read the column metadata after the response has been sent
+    upload_metadata[filename] = {"status": "pending"}
+    background_tasks.add_task(analyze_uploaded_excel, filename, file_path)
+
+    return {"filename": filename, "file_path": file_path, "status": "pending"}
+
+@api.get("/upload-meta/{filename}")
+async def get_upload_meta(filename: str):
+    """
+    Get the column metadata of an uploaded file
 
-        # Get suggestions for column mapping based on previous mappings
-        suggestions = get_suggestions(column_names)
-        data_logger.info(f"Generated {len(suggestions)} column mapping suggestions")
+    Returns:
+        The metadata with status "ready" (or "error"), or {"status": "pending"} while it is still being read
+    """
+    metadata = upload_metadata.get(filename)
+    if metadata is not None:
+        return metadata
+
+    file_path = os.path.join(UPLOADS_DIR, os.path.basename(filename))
+    if not os.path.isfile(file_path):
+        raise HTTPException(status_code=404, detail="Uploaded file not found")
 
-        # Get unique values for each column
-        unique_values = get_unique_column_values(df)
-        data_logger.info(f"Extracted unique values for {len(unique_values)} columns")
+    # Expired (or uploaded before a restart): read it again on demand
+    try:
+        return {"status": "ready", **await asyncio.to_thread(read_upload_metadata, file_path)}
     except Exception as e:
         error_msg = f"Error reading column names: {str(e)}"
         error_logger.error(error_msg)
-        column_names = []
-        suggestions = {}
-        unique_values = {}
-
-    return {"filename": filename, "file_path": file_path, "column_names": column_names, "suggestions": suggestions, "unique_values": unique_values}
+        return {"status": "error", "detail": error_msg, "column_names": [], "suggestions": {}, "unique_values": {}}
 
 @api.get("/mail-folders/")
 async def get_mail_folders():
@@ -1037,19 +1281,16 @@ async def get_mail_folders():
 
     try:
         # Check if the required environment variables are set
-        gmail_user = os.getenv("GMAIL_USER")
-        gmail_pass = os.getenv("GMAIL_PASS")
-
-        if not gmail_user or not gmail_pass:
+        if not GMAIL_USER or not GMAIL_PASS:
             error_msg = "Missing Gmail credentials. Please check your environment variables."
             error_logger.error(error_msg)
             raise HTTPException(status_code=500, detail=error_msg)
 
-        # Get all available mail folders
-        folders = list_mail_folders()
+        # Get all available mail folders (blocking IMAP, so off the event loop)
+        folders = await asyncio.to_thread(list_mail_folders)
 
         # Check if the configured folder exists
-        configured_folder = os.getenv("MAIL_FOLDER", "INBOX")
+        configured_folder = DEFAULT_MAIL_FOLDER
         folder_exists = configured_folder in folders
 
         return {
@@ -1062,6 +1303,20 @@ async def get_mail_folders():
         error_logger.error(error_msg)
         raise HTTPException(status_code=500, detail=error_msg)
 
+# Emails found by the last scan, keyed by email ID. The scan already downloads each
+# message, so fetching an attachment shortly afterwards reuses it instead of going
+# back to IMAP
+EMAIL_SCAN_CACHE_TTL = 60  # seconds
+email_scan_cache: Dict[str, Any] = {"emails": {}, "time": 0.0}
+
+def expire_email_scan_cache(scanned_at: float):
+    """
+    Release the cached emails (and their attachment data) of the scan made at scanned_at,
+    unless a newer scan has replaced them
+    """
+    if email_scan_cache["time"] == scanned_at:
+        email_scan_cache["emails"] = {}
+
 @api.get("/scan-emails/")
 async def scan_emails(days: int = 7, folders: str = None):
     """
@@ -1077,10 +1332,6 @@ async def scan_emails(days: int = 7, folders: str = None):
     api_logger.info(f"Scanning emails for Excel attachments (last {days} days)")
 
     try:
-        # Check if the required environment variables are set
-        gmail_user = os.getenv("GMAIL_USER")
-        gmail_pass = os.getenv("GMAIL_PASS")
-
         # Parse folders parameter or use default from environment
         mail_folders = []
         if folders:
@@ -1088,11 +1339,11 @@ async def scan_emails(days: int = 7, folders: str = None):
             api_logger.info(f"Using folders from request: {mail_folders}")
         else:
             # If no folders specified, use the configured folder from environment
-            default_folder = os.getenv("MAIL_FOLDER", "INBOX")
-            mail_folders = [default_folder]
-            api_logger.info(f"Using default folder from environment: {default_folder}")
+            mail_folders = [DEFAULT_MAIL_FOLDER]
+            api_logger.info(f"Using default folder from environment: {DEFAULT_MAIL_FOLDER}")
 
-        if not gmail_user or not gmail_pass:
+        # Check if the required environment variables are set
+        if not GMAIL_USER or not GMAIL_PASS:
             error_msg = "Missing Gmail credentials. Please check your environment variables."
             error_logger.error(error_msg)
             raise HTTPException(status_code=500, detail=error_msg)
@@ -1100,7 +1351,7 @@ async def scan_emails(days: int = 7, folders: str = None):
         api_logger.info(f"Scanning folders: {mail_folders}")
 
         # Get emails with attachments from all selected folders
-        emails = get_emails_with_attachments(days, mail_folders)
+        emails = await asyncio.to_thread(get_emails_with_attachments, days, mail_folders)
 
         # If no emails were found, it could be due to an error or just no matching emails
         if not emails:
@@ -1108,12 +1359,13 @@ async def scan_emails(days: int = 7, folders: str = None):
             # This is a simple approach - in a production app, you might want to use a more robust method
             api_logger.info("No emails with Excel attachments found. This could be normal or due to an error.")
 
-        # Remove raw attachment data from response
-        for email in emails:
-            if "_raw_attachments" in email:
-                del email["_raw_attachments"]
+        # Keep the raw attachment data in the scan cache only, not in the response
+        scanned_at = time.monotonic()
+        email_scan_cache["emails"] = {email["id"]: email for email in emails}
+        email_scan_cache["time"] = scanned_at
+        asyncio.get_running_loop().call_later(EMAIL_SCAN_CACHE_TTL, expire_email_scan_cache, scanned_at)
 
-        return {"emails": emails}
+        return {"emails": [{k: v for k, v in email.items() if k != "_raw_attachments"} for email in emails]}
     except HTTPException:
         raise
     except Exception as e:
@@ -1124,7 +1376,7 @@ async def scan_emails(days: int = 7, folders: str = None):
         if "authentication failed" in str(e).lower() or "login failed" in str(e).lower():
             error_msg = "Gmail authentication failed. Please check your credentials."
         elif "select failed" in str(e).lower() or "folder not found" in str(e).lower():
-            error_msg = f"Failed to select mail folder '{os.getenv('MAIL_FOLDER', 'INBOX')}'. The folder may not exist."
+            error_msg = f"Failed to select mail folder '{DEFAULT_MAIL_FOLDER}'. The folder may not exist."
         elif "network" in str(e).lower() or "connect" in str(e).lower():
             error_msg = "Network error while connecting to Gmail. Please check your internet connection."
 
@@ -1136,9 +1388,9 @@ async def fetch_attachment(email_id: str = Form(...), attachment_index: int = Fo
     Fetch an attachment from an email and save it to the uploads directory
 
     Args:
-        email_id (str): ID of the email
+        email_id (str): ID of the email, as returned by /scan-emails/ (encodes folder and UID)
         attachment_index (int): Index of the attachment to fetch
-        folders (str): Comma-separated list of folders to scan
+        folders (str): Comma-separated list of scanned folders (no longer needed, kept for older clients)
 
     Returns:
         Information about the saved attachment
@@ -1146,43 +1398,28 @@ async def fetch_attachment(email_id: str = Form(...), attachment_index: int = Fo
     api_logger.info(f"Fetching attachment {attachment_index} from email {email_id}")
 
     try:
-        # Parse folders parameter
-        mail_folders = None
-        if folders:
-            mail_folders = folders.split(',')
-            api_logger.info(f"Using folders from request: {mail_folders}")
-
-        # Get all emails with attachments from the specified folders
-        # Use a reasonable default search range to cover older emails
-        emails = get_emails_with_attachments(days=30, folders=mail_folders)
-
-        # Find the email with the specified ID
+        # Reuse the email from a recent scan; otherwise the ID carries the folder and UID,
+        # so the email is fetched directly instead of re-scanning the folders
+        parsed_id = parse_email_id(email_id)
         email_data = None
-        for email in emails:
-            if email["id"] == email_id:
-                email_data = email
-                break
-
-        # If email not found, try with broader search (all folders, extended time range)
-        if not email_data:
-            api_logger.info(f"Email {email_id} not found with initial search, trying broader search")
-            # Try searching in all available folders with extended time range (60 days)
-            emails_broader = get_emails_with_attachments(days=60, folders=None)
-            for email in emails_broader:
-                if email["id"] == email_id:
-                    email_data = email
-                    api_logger.info(f"Found email {email_id} in broader search")
-                    break
+        if time.monotonic() - email_scan_cache["time"] < EMAIL_SCAN_CACHE_TTL:
+            # Take the email out of the cache; its attachment data is not kept once it is saved
+            email_data = email_scan_cache["emails"].pop(email_id, None)
+        else:
+            email_scan_cache["emails"] = {}
+        if email_data is None and parsed_id:
+            email_data = await asyncio.to_thread(fetch_single_email_by_uid, *parsed_id)
 
         if not email_data:
             # Provide more helpful error message
-            folder_info = f" in folders {mail_folders}" if mail_folders else ""
-            error_msg = f"Email with ID {email_id} not found{folder_info}. The email may be in a different folder or older than the search range."
+            folder_info = f" in folder '{parsed_id[0]}'" if parsed_id else ""
+            error_msg = f"Email with ID {email_id} not found{folder_info}. The email may have been moved or deleted."
             error_logger.error(error_msg)
             raise HTTPException(status_code=404, detail=error_msg)
 
         # Save the attachment
-        file_path = save_attachment_from_email(email_data, attachment_index)
+        file_path = await asyncio.to_thread(save_attachment_from_email, email_data, attachment_index)
+        invalidate_files_count()
 
         if not file_path:
             error_msg = f"Failed to save attachment from email {email_id}"
@@ -1192,28 +1429,15 @@ async def fetch_attachment(email_id: str = Form(...), attachment_index: int = Fo
         # Get the filename from the path
         filename = os.path.basename(file_path)
 
-        # Read the Excel file to get column names
-        from src.data.etl import read_excel, get_unique_column_values
+        # Read the column metadata off the event loop
         try:
-            df = read_excel(file_path)
-            column_names = df.columns.tolist()
-            data_logger.info(f"Read Excel file with {len(df)} rows and {len(column_names)} columns")
-
-            # Get suggestions for column mapping based on previous mappings
-            suggestions = get_suggestions(column_names)
-            data_logger.info(f"Generated {len(suggestions)} column mapping suggestions")
-
-            # Get unique values for each column
-            unique_values = get_unique_column_values(df)
-            data_logger.info(f"Extracted unique values for {len(unique_values)} columns")
+            metadata = await asyncio.to_thread(read_upload_metadata, file_path)
         except Exception as e:
             error_msg = f"Error reading column names: {str(e)}"
             error_logger.error(error_msg)
-            column_names = []
-            suggestions = {}
-            unique_values = {}
+            metadata = {"column_names": [], "suggestions": {}, "unique_values": {}}
 
-        return {"filename": filename, "file_path": file_path, "column_names": column_names, "suggestions": suggestions, "unique_values": unique_values}
+        return {"filename": filename, "file_path": file_path, **metadata}
     except HTTPException:
         raise
     except Exception as e:
@@ -1248,43 +1472,40 @@ async def process_file(
 
     try:
         # Parse the column mapping JSON
-        mapping_dict = json.loads(column_mapping)
+        mapping_dict = orjson.loads(column_mapping)
         data_logger.info(f"Column mapping: {mapping_dict}")
 
         # Parse value mapping if provided
         value_mapping_dict = {}
         if value_mapping:
-            value_mapping_dict = json.loads(value_mapping)
+            value_mapping_dict = orjson.loads(value_mapping)
             data_logger.info(f"Value mapping: {value_mapping_dict}")
 
         # Validate the input file exists
-        input_path = os.path.join("src/data/uploads", filename)
+        input_path = os.path.join(UPLOADS_DIR, filename)
         if not os.path.exists(input_path):
             error_msg = f"File {filename} not found"
             error_logger.error(error_msg)
             raise HTTPException(status_code=404, detail=error_msg)
 
-        # Read the Excel file
-        df = read_excel(input_path)
+        # Read the Excel file in a worker thread to keep the event loop responsive
+        df = await asyncio.to_thread(read_excel, input_path)
 
         # Map columns according to the mapping
         from src.data.etl import map_columns
-        df = map_columns(df, mapping_dict)
+        df = await asyncio.to_thread(map_columns, df, mapping_dict)
 
         # Load existing row mappings
-        row_mappings = load_row_mappings()
+        row_mappings = await asyncio.to_thread(load_row_mappings)
         data_logger.info(f"Loaded row mappings for {len(row_mappings)} columns")
 
         # Check if there are any values that would be mapped
         potential_mappings = {}
         for column, mappings in row_mappings.items():
             if column in df.columns:
-                # Find values in the dataframe that have mappings
+                # Find values in the dataframe that have mappings (one lookup per distinct value)
                 column_values = df[column].astype(str).unique().tolist()
-                applicable_mappings = {}
-                for val in column_values:
-                    if val in mappings:
-                        applicable_mappings[val] = mappings[val]
+                applicable_mappings = {val: mappings[val] for val in column_values if val in mappings}
 
                 if applicable_mappings:
                     potential_mappings[column] = applicable_mappings
@@ -1331,16 +1552,14 @@ async def process_file(
                 if column in df.columns:
                     data_logger.info(f"Applying existing row mappings to {column}")
                     # Replace values according to the mapping
-                    df[column] = df[column].map(
-                        lambda x: mappings.get(str(x), x) if str(x) in mappings else x
-                    )
+                    df[column] = await asyncio.to_thread(apply_value_mapping, df[column], mappings, match_as_str=True)
 
         # Validate Main Unit Measurement values
-        validation_result = validate_main_unit_measurement(df)
+        validation_result = await asyncio.to_thread(validate_main_unit_measurement, df)
         data_logger.info(f"Main Unit Measurement validation result: {validation_result}")
 
         # Validate Alternative Unit Measurement values
-        alt_validation_result = validate_alternative_unit_measurement(df)
+        alt_validation_result = await asyncio.to_thread(validate_alternative_unit_measurement, df)
         data_logger.info(f"Alternative Unit Measurement validation result: {alt_validation_result}")
 
         # If either validation failed and no value mapping provided, return validation result
@@ -1389,37 +1608,31 @@ async def process_file(
             if primary_column in df.columns:
                 data_logger.info(f"Applying value mapping to {primary_column}")
                 # Replace values according to the mapping
-                df[primary_column] = df[primary_column].map(
-                    lambda x: value_mapping_dict.get(x, x) if x in value_mapping_dict else x
-                )
+                df[primary_column] = await asyncio.to_thread(apply_value_mapping, df[primary_column], value_mapping_dict)
 
                 # Store the mappings for future use
-                for original_value, mapped_value in value_mapping_dict.items():
-                    add_row_mapping(primary_column, original_value, mapped_value)
+                await asyncio.to_thread(add_row_mappings_bulk, primary_column, value_mapping_dict)
 
                 # Apply the same mapping to secondary column if needed
                 if apply_to_both and secondary_column in df.columns:
                     data_logger.info(f"Also applying value mapping to {secondary_column}")
                     # Replace values according to the mapping
-                    df[secondary_column] = df[secondary_column].map(
-                        lambda x: value_mapping_dict.get(x, x) if x in value_mapping_dict else x
-                    )
+                    df[secondary_column] = await asyncio.to_thread(apply_value_mapping, df[secondary_column], value_mapping_dict)
 
                     # Store the mappings for future use for the secondary column as well
-                    for original_value, mapped_value in value_mapping_dict.items():
-                        add_row_mapping(secondary_column, original_value, mapped_value)
+                    await asyncio.to_thread(add_row_mappings_bulk, secondary_column, value_mapping_dict)
 
                 # Validate again after mapping
                 # Use the same acceptable values as the first validation
                 if primary_column == 'Main Unit Measurement':
-                    validation_result = validate_main_unit_measurement(df)
+                    validation_result = await asyncio.to_thread(validate_main_unit_measurement, df)
                     # Also validate Alternative Unit Measurement if we applied mapping to both
                     if apply_to_both:
-                        alt_validation_result = validate_alternative_unit_measurement(df)
+                        alt_validation_result = await asyncio.to_thread(validate_alternative_unit_measurement, df)
                 elif primary_column == 'Alternative Unit Measurement':
-                    validation_result = validate_alternative_unit_measurement(df)
+                    validation_result = await asyncio.to_thread(validate_alternative_unit_measurement, df)
                 else:
-                    validation_result = validate_column_values(df, primary_column)
+                    validation_result = await asyncio.to_thread(validate_column_values, df, primary_column)
                 data_logger.info(f"Validation result after mapping: {validation_result}")
 
                 # If still invalid, return error
@@ -1431,11 +1644,12 @@ async def process_file(
         # Generate output filename
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
         output_filename = f"processed_{timestamp}_{filename}"
-        output_path = os.path.join("src/data/processed", output_filename)
+        output_path = os.path.join(PROCESSED_DIR, output_filename)
 
         # Export to Excel
         from src.data.etl import export_to_excel
-        result_path = export_to_excel(df, output_path)
+        result_path = await asyncio.to_thread(export_to_excel, df, output_path)
+        invalidate_files_count()
         data_logger.info(f"ETL process completed. Output file: {result_path}")
 
         # Store column mapping for future use
@@ -1445,7 +1659,7 @@ async def process_file(
         api_logger.info(f"File processed successfully: {output_filename}")
         return {"message": "File processed successfully", "output_filename": output_filename}
 
-    except json.JSONDecodeError:
+    except orjson.JSONDecodeError:
         error_msg = "Invalid column mapping format"
         error_logger.error(error_msg)
         raise HTTPException(status_code=400, detail=error_msg)
@@ -1454,14 +1668,154 @@ async def process_file(
         error_logger.error(error_msg)
         raise HTTPException(status_code=500, detail=error_msg)
 
+# Short-lived cache for /api/files-count so polling clients do not rescan the folders;
+# anything that adds or removes files in them calls invalidate_files_count()
+FILES_COUNT_CACHE_TTL = 0.5  # seconds
+files_count_cache: Dict[str, Any] = {"value": None, "time": 0.0}
+
+def invalidate_files_count():
+    """
+    Drop the cached files count so the next request rescans the folders
+    """
+    files_count_cache["time"] = 0.0
+
+def count_files(folder: str) -> int:
+    """
+    Count the regular files directly inside a folder, leaving out dotfiles such as .gitkeep
+    """
+    with os.scandir(folder) as entries:
+        return sum(1 for entry in entries if not entry.name.startswith(".") and entry.is_file())
+
+# Folders with at least this many files are unlinked from a small thread pool
+PARALLEL_UNLINK_THRESHOLD = 64
+PARALLEL_UNLINK_WORKERS = 32
+
+def remove_folder_files(folder: str, keep_file: Optional[str] = None) -> int:
+    """
+    Delete the files directly inside a folder, leaving dotfiles such as .gitkeep in place
+
+    Args:
+        folder: Folder to clear
+        keep_file: Name of a file to keep
+
+    Returns:
+        Number of deleted files
+    """
+    with os.scandir(folder) as entries:
+        files = [entry for entry in entries
+                 if entry.name != keep_file and not entry.name.startswith(".") and entry.is_file()]
+    # Unlinking in inode order keeps directory block updates local on large folders
+    files.sort(key=lambda entry: entry.inode())
+    paths = [entry.path for entry in files]
+    if len(paths) >= PARALLEL_UNLINK_THRESHOLD:
+        # Independent unlinks overlap well in the kernel; a bounded pool keeps the
+        # number of threads fixed no matter how large the folder is
+        with ThreadPoolExecutor(max_workers=PARALLEL_UNLINK_WORKERS) as executor:
+            for _ in executor.map(os.unlink, paths):
+                pass
+    else:
+        for path in paths:
+            os.unlink(path)
+    # Per-file tracing only when DEBUG is on; callers log a single summary line
+    if api_logger.isEnabledFor(logging.DEBUG):
+        for path in paths:
+            api_logger.debug("Removed file: %s", path)
+    return len(paths)
+
+def swap_out_folder(folder: str) -> str:
+    """
+    Move a folder aside to a hidden trash name and swap an empty one in its place
+
+    The empty replacement is created before the swap, so the folder is missing only
+    between two renames; writers still create it if they hit that moment.
+
+    Args:
+        folder: Folder to empty
+
+    Returns:
+        Path of the trash folder holding the old contents
+    """
+    parent, name = os.path.split(folder)
+    suffix = f"{os.getpid()}.{time.time_ns()}"
+    trash = os.path.join(parent, f".{name}.trash.{suffix}")
+    replacement = os.path.join(parent, f".{name}.new.{suffix}")
+    os.mkdir(replacement)
+    try:
+        os.rename(folder, trash)
+    except OSError:
+        os.rmdir(replacement)
+        raise
+    try:
+        os.rename(replacement, folder)
+    except OSError:
+        # A writer recreated the folder in between; it is empty apart from its new files
+        os.rmdir(replacement)
+    return trash
+
+def clear_data_folders(keep_file: Optional[str] = None) -> int:
+    """
+    Delete the files in the processed and uploads folders (blocking; see clear_data)
+
+    Args:
+        keep_file: Name of a processed file to keep
+
+    Returns:
+        Number of deleted files
+    """
+    deleted_count = 0
+    try:
+        # Folders cleared completely are renamed away and recreated first, so they are
+        # empty at once and files arriving during the deletion are left alone
+        trash_folders = []
+        for folder, keep in ((PROCESSED_DIR, keep_file), (UPLOADS_DIR, None)):
+            if keep is None:
+                try:
+                    trash_folders.append((folder, swap_out_folder(folder)))
+                    continue
+                except OSError as e:
+                    # e.g. a file inside is still open on Windows; delete in place instead
+                    api_logger.warning("Could not move %s aside, clearing it in place: %s", folder, e)
+            deleted_count += remove_folder_files(folder, keep)
+        invalidate_files_count()
+
+        for folder, trash in trash_folders:
+            deleted_count += remove_folder_files(trash)
+            # Dotfiles are kept, and a writer that looked the folder up just before the swap can
+            # still create its file in the trash folder; move those back instead of deleting them
+            with os.scandir(trash) as entries:
+                for entry in entries:
+                    if entry.is_file():
+                        os.replace(entry.path, os.path.join(folder, entry.name))
+            try:
+                shutil.rmtree(trash)
+            except OSError as e:
+                error_logger.error(f"Error removing trash folder {trash}: {str(e)}")
+
+        api_logger.info("Processed and uploads folders cleared successfully. Deleted %d files.", deleted_count)
+    except Exception as e:
+        error_msg = f"Error clearing folders: {str(e)}"
+        error_logger.error(error_msg)
+    return deleted_count
+
+async def clear_data(keep_file: Optional[str] = None) -> int:
+    """
+    Clear the data folders in a worker thread, then drop the metadata of the removed uploads
+
+    Returns:
+        Number of deleted files
+    """
+    deleted_count = await asyncio.to_thread(clear_data_folders, keep_file)
+    upload_metadata.clear()
+    return deleted_count
+
 @api.get("/download/{filename}")
-async def download_file(filename: str):
+async def download_file(filename: str, background_tasks: BackgroundTasks):
     """
     Download a processed Excel file and clear processed and uploads folders
     """
     api_logger.info(f"Download requested for file: {filename}")
 
-    file_path = os.path.join("src/data/processed", filename)
+    file_path = os.path.join(PROCESSED_DIR, filename)
     if not os.path.exists(file_path):
         error_msg = f"File {filename} not found"
         error_logger.error(error_msg)
@@ -1474,31 +1828,9 @@ async def download_file(filename: str):
         media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
     )
 
-    # Clear processed and uploads folders after download
-    try:
-        # Keep the current file being downloaded
-        current_file = os.path.basename(file_path)
-
-        # Clear processed folder (except the file being downloaded)
-        for file in os.listdir("src/data/processed"):
-            if file != current_file:
-                file_to_remove = os.path.join("src/data/processed", file)
-                if os.path.isfile(file_to_remove):
-                    os.remove(file_to_remove)
-                    api_logger.info(f"Removed processed file: {file}")
-
-        # Clear uploads folder
-        for file in os.listdir("src/data/uploads"):
-            file_to_remove = os.path.join("src/data/uploads", file)
-            if os.path.isfile(file_to_remove):
-                os.remove(file_to_remove)
-                api_logger.info(f"Removed uploaded file: {file}")
-
-        api_logger.info("Processed and uploads folders cleared successfully")
-    except Exception as e:
-        error_msg = f"Error clearing folders: {str(e)}"
-        error_logger.error(error_msg)
-        # Don't raise an exception here to ensure the download still works
+    # Clear processed and uploads folders once the response has been sent,
+    # keeping the file being downloaded
+    background_tasks.add_task(clear_data, os.path.basename(file_path))
 
     return response
 
@@ -1510,31 +1842,11 @@ async def flash_files():
     """
     api_logger.info("Flash Files requested")
 
-    deleted_count = 0
-
     try:
-        # Count files before deletion
-        processed_files = [f for f in os.listdir("src/data/processed") if os.path.isfile(os.path.join("src/data/processed", f))]
-        uploads_files = [f for f in os.listdir("src/data/uploads") if os.path.isfile(os.path.join("src/data/uploads", f))]
-
-        total_files = len(processed_files) + len(uploads_files)
-
-        # Clear processed folder
-        for file in processed_files:
-            file_to_remove = os.path.join("src/data/processed", file)
-            os.remove(file_to_remove)
-            deleted_count += 1
-            api_logger.info(f"Removed processed file: {file}")
-
-        # Clear uploads folder
-        for file in uploads_files:
-            file_to_remove = os.path.join("src/data/uploads", file)
-            os.remove(file_to_remove)
-            deleted_count += 1
-            api_logger.info(f"Removed uploaded file: {file}")
-
-        api_logger.info(f"Processed and uploads folders cleared successfully. Deleted {deleted_count} files.")
-        return {"message": "Folders cleared successfully", "deleted_count": deleted_count}
+        # Clear in a worker thread and report the number of files actually deleted
+        deleted_count = await clear_data()
+        # Returning the response directly skips FastAPI's jsonable_encoder pass
+        return ORJSONResponse({"message": "Folders cleared successfully", "deleted_count": deleted_count})
 
     except Exception as e:
         error_msg = f"Error clearing folders: {str(e)}"
@@ -1549,18 +1861,29 @@ async def get_files_count():
     api_logger.info("Files count requested")
 
     try:
-        # Count files
-        processed_files = [f for f in os.listdir("src/data/processed") if os.path.isfile(os.path.join("src/data/processed", f))]
-        uploads_files = [f for f in os.listdir("src/data/uploads") if os.path.isfile(os.path.join("src/data/uploads", f))]
+        now = time.monotonic()
+        cached = files_count_cache["value"]
+        if cached is not None and now - files_count_cache["time"] < FILES_COUNT_CACHE_TTL:
+            return ORJSONResponse(cached)
+
+        # Count both folders concurrently in worker threads, off the event loop
+        processed_count, uploads_count = await asyncio.gather(
+            asyncio.to_thread(count_files, PROCESSED_DIR),
+            asyncio.to_thread(count_files, UPLOADS_DIR),
+        )
 
-        total_files = len(processed_files) + len(uploads_files)
+        total_files = processed_count + uploads_count
 
-        api_logger.info(f"Files count: {total_files} (Processed: {len(processed_files)}, Uploads: {len(uploads_files)})")
-        return {
+        api_logger.info("Files count: %d (Processed: %d, Uploads: %d)", total_files, processed_count, uploads_count)
+        result = {
             "total": total_files,
-            "processed": len(processed_files),
-            "uploads": len(uploads_files)
+            "processed": processed_count,
+            "uploads": uploads_count
         }
+        files_count_cache["value"] = result
+        files_count_cache["time"] = now
+        # Returning the response directly skips FastAPI's jsonable_encoder pass
+        return ORJSONResponse(result)
 
     except Exception as e:
         error_msg = f"Error counting files: {str(e)}"
@@ -1627,7 +1950,7 @@ async def pricing_calc(payload: Dict[str, Any]):
         )
         result = PRICING_ENGINE.calculate(req)
         api_logger.info("Pricing calculation completed successfully")
-        return JSONResponse(content=result)
+        return ORJSONResponse(content=result)
     except ValueError as ve:
         error_logger.error(f"Pricing validation error: {ve}")
         raise HTTPException(status_code=400, detail=str(ve))
@@ -2017,7 +2340,7 @@ async def pricing_calc_slabs(payload: Dict[str, Any]):
         # Edge-case example check from description: Infinity, 6mm, 15 units => propose A-Frame 1 palette, Crate => 2 palettes
         # Our logic now also optimizes remainder to Crate if it fits.
 
-        return JSONResponse(content=result)
+        return ORJSONResponse(content=result)
     except ValueError as ve:
         error_logger.error(f"SLABs pricing validation error: {ve}")
         raise HTTPException(status_code=400, detail=str(ve))
@@ -2061,7 +2384,7 @@ async def pricing_calc_slabs(payload: Dict[str, Any]):
         )
         result = PRICING_ENGINE.calculate(req)
         api_logger.info("Pricing calculation completed successfully")
-        return JSONResponse(content=result)
+        return ORJSONResponse(content=result)
     except ValueError as ve:
         error_logger.error(f"Pricing validation error: {ve}")
         raise HTTPException(status_code=400, detail=str(ve))
@@ -2069,45 +2392,34 @@ async def pricing_calc_slabs(payload: Dict[str, Any]):
         error_logger.error(f"Pricing calculation failed: {e}")
         raise HTTPException(status_code=500, detail="Internal error during pricing calculation")
 
+@lru_cache(maxsize=1)
 def get_ip_address():
     """
     Gets the local IP address by connecting to Google's DNS server.
+    The result is cached; falls back to the hostname's address, then 127.0.0.1,
+    when no route is available.
     """
     s = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-    s.connect(("8.8.8.8", 80))
-    return s.getsockname()[0]
-
-def ensure_folders_exist():
-    """
-    Ensure that required folders exist
-    """
-    required_folders = ["src/data/processed", "src/data/uploads"]
-    for folder in required_folders:
-        if not os.path.exists(folder):
-            os.makedirs(folder)
-            app_logger.info(f"Created folder: {folder}")
-        else:
-            app_logger.info(f"Folder exists: {folder}")
-
-if __name__ == "__main__":
-    # Check if websockets package is installed, if not install it
+    s.settimeout(0.2)
     try:
-        import websockets
-    except ImportError:
-        import subprocess
-        import sys
-        app_logger.info("Installing websockets package...")
-        subprocess.check_call([sys.executable, "-m", "pip", "install", "websockets"])
-        app_logger.info("websockets package installed successfully")
+        s.connect(("8.8.8.8", 80))
+        return s.getsockname()[0]
+    except OSError:
+        try:
+            return socket.gethostbyname(socket.gethostname())
+        except OSError:
+            return "127.0.0.1"
+    finally:
+        s.close()
 
+if __name__ == "__main__":
     import uvicorn
     host = "0.0.0.0"  # Listen on all available network interfaces
     my_ip = get_ip_address()  # Get the actual IP address for display purposes
     port = 3000
 
-    # Ensure required folders exist
-    ensure_folders_exist()
-
     app_logger.info(f"Starting server on {my_ip}:{port}")
     app_logger.info(f"Server will be accessible at http://{my_ip}:{port} from other devices on the network")
-    uvicorn.run("main:api", host=my_ip, port=port, log_level="info", reload=False)
+    # loop/http "auto" pick uvloop and httptools when installed (uvicorn[standard]).
+    # Stay on one worker: uploads metadata, caches and websocket users live in process memory.
+    uvicorn.run("main:api", host=host, port=port, log_level="info", reload=False, loop="auto", http="auto")
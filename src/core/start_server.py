@@ -6,7 +6,10 @@ import subprocess
 import socket
 import atexit
 import time
+import threading
 import psutil
+from collections import deque
+from functools import lru_cache
 from dotenv import load_dotenv
 
 # Load environment variables from .env file
@@ -42,80 +45,93 @@ def activate_venv():
 # Try to activate virtual environment
 activate_venv()
 
+@lru_cache(maxsize=1)
 def get_ip_address():
-    """Get the IP address of the machine."""
+    """Get the IP address of the machine (cached)."""
+    # Try to get the IP address using socket
+    s = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    s.settimeout(0.2)
     try:
-        # Try to get the IP address using socket
-        s = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
         s.connect(("8.8.8.8", 80))
-        ip_address = s.getsockname()[0]
-        s.close()
-        return ip_address
-    except:
+        return s.getsockname()[0]
+    except OSError:
         # Fallback to localhost if unable to determine IP
         return "127.0.0.1"
+    finally:
+        s.close()
 
 def is_port_in_use(port):
     """Check if a port is in use."""
     with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
         return s.connect_ex(('localhost', port)) == 0
 
-def find_uvicorn_processes(port=None):
-    """Find all running uvicorn processes, optionally filtering by port."""
-    uvicorn_pids = []
+def iter_processes():
+    """Yield (pid, name, cmdline) for every running process."""
+    if os.path.isdir("/proc/self"):
+        # On Linux read /proc directly; psutil would build a Process object per PID
+        for entry in os.listdir("/proc"):
+            if not entry.isdigit():
+                continue
+            try:
+                with open(f"/proc/{entry}/comm", "rb") as f:
+                    name = f.read().decode(errors="replace").strip()
+                with open(f"/proc/{entry}/cmdline", "rb") as f:
+                    cmdline = [arg.decode(errors="replace") for arg in f.read().split(b"\0") if arg]
+            except OSError:
+                # The process exited or is not readable
+                continue
+            yield int(entry), name, cmdline
+        return
 
     for proc in psutil.process_iter(['pid', 'name', 'cmdline']):
-        try:
-            # Check if this is a uvicorn process
-            if proc.info['name'] == 'python' or 'python' in proc.info['name'].lower():
-                cmdline = proc.info['cmdline']
-                if cmdline and ('uvicorn' in ' '.join(cmdline) or 'main:api' in ' '.join(cmdline) or 'src.core.main:api' in ' '.join(cmdline)):
-                    # If port is specified, check if this process is using that port
-                    if port is None or (f"--port={port}" in cmdline or f"--port {port}" in ' '.join(cmdline)):
-                        uvicorn_pids.append(proc.info['pid'])
-        except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess):
-            pass
+        yield proc.info['pid'], proc.info['name'] or "", proc.info['cmdline'] or []
 
-    return uvicorn_pids
+def find_uvicorn_processes(port=None):
+    """Yield the PIDs of running uvicorn processes as they are found, optionally filtering by port."""
+    for pid, name, cmdline in iter_processes():
+        # Check if this is a uvicorn process
+        if 'python' in name.lower():
+            command = ' '.join(cmdline)
+            if 'uvicorn' in command or 'main:api' in command:
+                # If port is specified, check if this process is using that port
+                if port is None or (f"--port={port}" in cmdline or f"--port {port}" in command):
+                    yield pid
 
 def stop_uvicorn(port=None):
     """Stop all running uvicorn processes, optionally filtering by port."""
     print("Checking for running uvicorn processes...")
-    uvicorn_pids = find_uvicorn_processes(port)
-
-    if not uvicorn_pids:
-        print("No running uvicorn processes found.")
-        return
-
-    print(f"Found uvicorn processes with PIDs: {uvicorn_pids}")
-    print("Stopping uvicorn processes...")
-
-    # Kill each uvicorn process
-    for pid in uvicorn_pids:
+    found = False
+    processes = []
+
+    # Send SIGTERM to each uvicorn process as soon as the scan finds it
+    for pid in find_uvicorn_processes(port):
+        if not found:
+            print("Stopping uvicorn processes...")
+            found = True
         try:
             print(f"Killing process {pid}...")
-            os.kill(pid, signal.SIGTERM)
-
-            # Wait for the process to terminate
-            try:
-                process = psutil.Process(pid)
-                process.wait(timeout=5)  # Wait up to 5 seconds for graceful termination
-            except (psutil.NoSuchProcess, psutil.TimeoutExpired):
-                # If process doesn't exist or timeout, try SIGKILL
-                try:
-                    os.kill(pid, signal.SIGKILL)
-                except ProcessLookupError:
-                    pass
-
-        except ProcessLookupError:
+            process = psutil.Process(pid)
+            process.terminate()
+            processes.append(process)
+        except psutil.NoSuchProcess:
             print(f"Process {pid} not found.")
         except Exception as e:
             print(f"Error killing process {pid}: {e}")
 
-    print("All uvicorn processes have been stopped.")
+    if not found:
+        print("No running uvicorn processes found.")
+        return
 
-    # Small delay to ensure processes are fully terminated
-    time.sleep(1)
+    # Wait up to 5 seconds for all of them together, then SIGKILL whatever is left
+    _, alive = psutil.wait_procs(processes, timeout=5)
+    for process in alive:
+        try:
+            process.kill()
+        except psutil.NoSuchProcess:
+            pass
+    psutil.wait_procs(alive, timeout=1)
+
+    print("All uvicorn processes have been stopped.")
 
 def start_uvicorn(host="0.0.0.0", port=3000, reload=True):
     """Start the uvicorn server."""
@@ -153,15 +169,28 @@ def start_uvicorn(host="0.0.0.0", port=3000, reload=True):
     if reload:
         cmd.append("--reload")
 
+    # stdout is not shown; stderr is read by capture_stderr so the pipe never fills up
     process = subprocess.Popen(
         cmd,
-        stdout=subprocess.PIPE,
+        stdout=subprocess.DEVNULL,
         stderr=subprocess.PIPE,
         text=True
     )
 
     return process
 
+def capture_stderr(process, max_lines=200):
+    """Drain a process's stderr in a background thread, keeping its last max_lines lines."""
+    lines = deque(maxlen=max_lines)
+
+    def drain():
+        for line in process.stderr:
+            lines.append(line)
+
+    reader = threading.Thread(target=drain, daemon=True)
+    reader.start()
+    return lines, reader
+
 def restart_services(host="0.0.0.0", port=3000, reload=True):
     """Restart all services."""
     print("Restarting services...")
@@ -179,12 +208,13 @@ def main():
     # Register the cleanup function to be called on exit
     atexit.register(cleanup)
 
-    # Handle keyboard interrupts
+    # Handle keyboard interrupts and termination requests
     def signal_handler(sig, frame):
-        print("\nReceived keyboard interrupt. Shutting down...")
+        print("\nReceived interrupt signal. Shutting down...")
         sys.exit(0)
 
     signal.signal(signal.SIGINT, signal_handler)
+    signal.signal(signal.SIGTERM, signal_handler)
 
     # Parse command line arguments
     import argparse
@@ -209,26 +239,26 @@ def main():
     # Keep the script running to handle signals and monitor the process
     try:
         while True:
-            # Check if the process is still running
-            if process.poll() is not None:
-                print(f"uvicorn process exited with code {process.returncode}")
-                # Print any error output
-                stderr = process.stderr.read()
-                if stderr:
-                    print(f"Error output: {stderr}")
-
-                # If the process exited due to port already in use, try to stop the existing process and restart
-                if "Address already in use" in stderr:
-                    print("Detected 'Address already in use' error. Attempting to stop existing process and restart...")
-                    stop_uvicorn(port)
-                    time.sleep(2)  # Wait a bit for the port to be released
-                    process = start_uvicorn(host, port, reload)
-                else:
-                    # For other errors, just exit
-                    break
-
-            # Sleep to avoid high CPU usage
-            time.sleep(1)
+            # Block until uvicorn exits; signals still interrupt the wait
+            stderr_lines, reader = capture_stderr(process)
+            process.wait()
+            reader.join(timeout=1)
+            print(f"uvicorn process exited with code {process.returncode}")
+
+            # Print any error output
+            stderr = "".join(stderr_lines)
+            if stderr:
+                print(f"Error output: {stderr}")
+
+            # If the process exited due to port already in use, try to stop the existing process and restart
+            if "Address already in use" in stderr:
+                print("Detected 'Address already in use' error. Attempting to stop existing process and restart...")
+                stop_uvicorn(port)
+                time.sleep(2)  # Wait a bit for the port to be released
+                process = start_uvicorn(host, port, reload)
+            else:
+                # For other errors, just exit
+                break
     except KeyboardInterrupt:
         pass
 
@@ -1,5 +1,6 @@
 import os
 import json
+import orjson
 from typing import Dict, Set, List, Optional
 import logging
 
@@ -9,6 +10,9 @@ logger = logging.getLogger(__name__)
 # File to store column mappings
 MAPPINGS_FILE = "src/config/column_mappings.json"
 
+# Parsed mappings file and the (mtime, size) of the file it was read from
+_mappings_cache = {"stamp": None, "mappings": {}}
+
 def load_mappings() -> Dict[str, Set[str]]:
     """
     Load column mappings from the JSON file.
@@ -18,10 +22,16 @@ def load_mappings() -> Dict[str, Set[str]]:
     """
     try:
         if os.path.exists(MAPPINGS_FILE):
-            with open(MAPPINGS_FILE, 'r') as f:
-                # JSON can't store sets, so we convert lists back to sets
-                mappings_dict = json.load(f)
-                return {k: set(v) for k, v in mappings_dict.items()}
+            # Re-read the file only when it has changed since the last load
+            stat = os.stat(MAPPINGS_FILE)
+            stamp = (stat.st_mtime_ns, stat.st_size)
+            if _mappings_cache["stamp"] != stamp:
+                with open(MAPPINGS_FILE, 'rb') as f:
+                    _mappings_cache["mappings"] = orjson.loads(f.read())
+                _mappings_cache["stamp"] = stamp
+
+            # JSON can't store sets, so we convert lists back to sets
+            return {k: set(v) for k, v in _mappings_cache["mappings"].items()}
         else:
             logger.info(f"Mappings file {MAPPINGS_FILE} not found. Creating new mappings.")
             return {}
@@ -1,11 +1,30 @@
 import pandas as pd
+import openpyxl
 import os
 import json
+import orjson
 import re
+import threading
+from collections import defaultdict
 from typing import List, Dict, Any, Optional, Tuple
 import logging
 from dotenv import load_dotenv
 
+# pandas reads workbooks much faster through the Rust calamine engine; without
+# python-calamine it falls back to its default engine (openpyxl for .xlsx)
+try:
+    import python_calamine  # noqa: F401
+    EXCEL_ENGINE = "calamine"
+except ImportError:
+    EXCEL_ENGINE = None
+
+# Likewise, xlsxwriter writes workbooks faster than openpyxl and can format a whole column at once
+try:
+    import xlsxwriter  # noqa: F401
+    EXCEL_WRITER_ENGINE = "xlsxwriter"
+except ImportError:
+    EXCEL_WRITER_ENGINE = "openpyxl"
+
 # Load environment variables
 load_dotenv()
 
@@ -42,13 +61,134 @@ def read_excel(file_path: str) -> pd.DataFrame:
     """
     try:
         logger.info(f"Reading Excel file: {file_path}")
-        df = pd.read_excel(file_path)
+        df = pd.read_excel(file_path, engine=EXCEL_ENGINE)
         logger.info(f"Successfully read Excel file with {len(df)} rows and {len(df.columns)} columns")
         return df
     except Exception as e:
         logger.error(f"Error reading Excel file: {str(e)}")
         raise
 
+def _pandas_column_names(header: List[Any], width: int) -> List[Any]:
+    """
+    Name width columns from a header row the way pandas' Excel reader does: blank headers
+    become "Unnamed: i" and repeated names get the first unused ".n" suffix (named columns
+    are deduplicated before unnamed ones)
+    """
+    names: List[Any] = []
+    unnamed: List[int] = []
+    for i in range(width):
+        name = header[i] if i < len(header) else None
+        if name is None or name == "":
+            name = f"Unnamed: {i}"
+            unnamed.append(i)
+        elif isinstance(name, float) and name.is_integer():
+            name = int(name)
+        names.append(name)
+
+    counts: Dict[Any, int] = defaultdict(int)
+    for i in [i for i in range(width) if i not in unnamed] + unnamed:
+        name = original = names[i]
+        count = counts[name]
+        while count > 0:
+            counts[original] = count + 1
+            name = f"{original}.{count}"
+            count = count + 1 if name in names else counts[name]
+        names[i] = name
+        counts[name] = count + 1
+    return names
+
+def _summarize_rows(rows, max_values: int, sheet_width: int = 0, max_row: Optional[int] = None):
+    """
+    Collect the header and the first max_values unique values of each column from rows of cells
+
+    The first row is the header. The scan stops once every column, including the sheet_width
+    columns the sheet says it has, holds max_values values; the row count then comes from
+    max_row (the number of rows including the header, None if unknown).
+
+    Returns:
+        Tuple of (header, width, values per column, number of data rows)
+    """
+    header = list(next(rows, ()))
+    header = [None if cell is None or cell != cell else cell for cell in header]  # NaN is blank
+    width = max((i + 1 for i, cell in enumerate(header) if cell is not None and cell != ""), default=0)
+    column_values: List[List[Any]] = []
+    full_columns = 0
+    row_count: Optional[int] = 0
+
+    for row_number, row in enumerate(rows, start=1):
+        has_value = False
+        for i, cell in enumerate(row):
+            if cell is None or cell == "" or cell != cell:
+                continue
+            has_value = True
+            if i >= width:
+                width = i + 1
+            while len(column_values) <= i:
+                column_values.append([])
+            values = column_values[i]
+            if len(values) < max_values:
+                # Integer cells may come back as floats: show them as "1", not "1.0"
+                if isinstance(cell, float) and cell.is_integer():
+                    cell = int(cell)
+                if cell not in values:
+                    values.append(cell)
+                    if len(values) == max_values:
+                        full_columns += 1
+        # Trailing blank rows are not part of the data
+        if has_value:
+            row_count = row_number
+        # Every column has its values: the rest of the sheet cannot change the summary
+        if width and full_columns >= max(width, sheet_width):
+            row_count = max_row - 1 if max_row else None
+            break
+
+    return header, width, column_values, row_count
+
+def read_excel_summary(file_path: str, max_values: int = 3) -> Tuple[List[Any], Dict[Any, List[str]], Optional[int]]:
+    """
+    Read the column names and the first unique values of each column without loading the whole sheet
+
+    .xlsx files are streamed row by row with openpyxl in read-only mode, keeping at most
+    max_values values per column and stopping once every column has them. Other formats
+    are read whole with pandas (header=None, so leading blank rows keep their place) and
+    summarized the same way.
+
+    Args:
+        file_path: Path to the Excel file
+        max_values: Maximum number of unique values to collect for each column
+
+    Returns:
+        Tuple of (column names, unique values per column, number of data rows). When the
+        scan stops early the row count comes from the sheet dimensions, and is None if
+        the file does not record them.
+    """
+    try:
+        logger.info(f"Reading column summary of Excel file: {file_path}")
+        if file_path.lower().endswith('.xlsx'):
+            workbook = openpyxl.load_workbook(file_path, read_only=True, data_only=True)
+            try:
+                # Like pandas, read the first sheet and treat its first row as the header
+                sheet = workbook.worksheets[0]
+                header, width, column_values, row_count = _summarize_rows(
+                    sheet.iter_rows(values_only=True), max_values, sheet.max_column or 0, sheet.max_row)
+            finally:
+                workbook.close()
+        else:
+            df = pd.read_excel(file_path, header=None, engine=EXCEL_ENGINE)
+            header, width, column_values, row_count = _summarize_rows(
+                df.itertuples(index=False, name=None), max_values, df.shape[1], len(df))
+
+        column_names = _pandas_column_names(header, width)
+        unique_values = {
+            name: [str(value) for value in (column_values[i] if i < len(column_values) else [])]
+            for i, name in enumerate(column_names)
+        }
+        logger.info(f"Successfully read column summary with {row_count} rows and {len(column_names)} columns")
+        return column_names, unique_values, row_count
+    except Exception as e:
+        logger.error(f"Error reading Excel column summary: {str(e)}")
+        raise
+
 def map_columns(df: pd.DataFrame, column_mapping: Dict[str, str]) -> pd.DataFrame:
     """
     Map columns from the source DataFrame to the required format
@@ -90,6 +230,24 @@ def map_columns(df: pd.DataFrame, column_mapping: Dict[str, str]) -> pd.DataFram
         logger.error(f"Error mapping columns: {str(e)}")
         raise
 
+def apply_value_mapping(series: pd.Series, mapping: Dict[str, Any], match_as_str: bool = False) -> pd.Series:
+    """
+    Replace the values of a column that appear in a mapping, leaving all other values untouched
+
+    Args:
+        series: Column to map
+        mapping: Dictionary mapping original values to replacement values
+        match_as_str: Look values up by their string form (as row mappings are stored)
+
+    Returns:
+        Mapped column (the original Series if no value matched)
+    """
+    keys = series.map(str) if match_as_str else series
+    matched = keys.isin(list(mapping))
+    if not matched.any():
+        return series
+    return keys.map(mapping).where(matched, series)
+
 def transform_data(df: pd.DataFrame) -> pd.DataFrame:
     """
     Apply any necessary transformations to the data
@@ -121,6 +279,11 @@ def transform_data(df: pd.DataFrame) -> pd.DataFrame:
         logger.error(f"Error transforming data: {str(e)}")
         raise
 
+# Parsed rown_mapping.json and the (mtime, size) of the file it was read from
+_row_mappings_cache: Dict[str, Any] = {"stamp": None, "mappings": {}}
+# Guards the cache and rown_mapping.json, which the API reads and writes from worker threads
+_row_mappings_lock = threading.RLock()
+
 def load_row_mappings() -> Dict[str, Dict[str, str]]:
     """
     Load row mappings from rown_mapping.json file
@@ -129,10 +292,19 @@ def load_row_mappings() -> Dict[str, Dict[str, str]]:
         Dictionary with column names as keys and dictionaries of value mappings as values
     """
     try:
-        logger.info("Loading row mappings from rown_mapping.json")
         if os.path.exists("src/config/rown_mapping.json"):
-            with open("src/config/rown_mapping.json", "r") as f:
-                mappings = json.load(f)
+            with _row_mappings_lock:
+                # Re-read the file only when it has changed since the last load
+                stat = os.stat("src/config/rown_mapping.json")
+                stamp = (stat.st_mtime_ns, stat.st_size)
+                if _row_mappings_cache["stamp"] != stamp:
+                    logger.info("Loading row mappings from rown_mapping.json")
+                    with open("src/config/rown_mapping.json", "rb") as f:
+                        _row_mappings_cache["mappings"] = orjson.loads(f.read())
+                    _row_mappings_cache["stamp"] = stamp
+
+                # Hand out a copy so callers can modify it without touching the cache
+                mappings = {column: dict(values) for column, values in _row_mappings_cache["mappings"].items()}
             logger.info(f"Loaded row mappings for {len(mappings)} columns")
             return mappings
         else:
@@ -313,26 +485,42 @@ def add_row_mapping(column: str, value: str, mapped_value: str) -> bool:
     Returns:
         True if mapping was added successfully, False otherwise
     """
+    logger.info(f"Adding row mapping for column '{column}': {value} -> {mapped_value}")
+    return add_row_mappings_bulk(column, {value: mapped_value})
+
+def add_row_mappings_bulk(column: str, pairs: Dict[str, str]) -> bool:
+    """
+    Add several row mappings for one column to rown_mapping.json with a single write
+
+    Args:
+        column: Column name
+        pairs: Dictionary of original values to mapped values
+
+    Returns:
+        True if mappings were added successfully, False otherwise
+    """
     try:
-        logger.info(f"Adding row mapping for column '{column}': {value} -> {mapped_value}")
+        if not pairs:
+            return True
 
-        # Load existing mappings
-        mappings = load_row_mappings()
+        logger.info(f"Adding {len(pairs)} row mappings for column '{column}'")
 
-        # Add new mapping
-        if column not in mappings:
-            mappings[column] = {}
+        # Load, update and save under the lock so concurrent writers do not drop each other's mappings
+        with _row_mappings_lock:
+            # Load existing mappings
+            mappings = load_row_mappings()
 
-        mappings[column][value] = mapped_value
+            # Add new mappings
+            mappings.setdefault(column, {}).update(pairs)
 
-        # Save mappings
-        with open("src/config/rown_mapping.json", "w") as f:
-            json.dump(mappings, f, indent=2)
+            # Save mappings
+            with open("src/config/rown_mapping.json", "w") as f:
+                json.dump(mappings, f, indent=2)
 
-        logger.info(f"Row mapping added successfully")
+        logger.info(f"Row mappings added successfully")
         return True
     except Exception as e:
-        logger.error(f"Error adding row mapping: {str(e)}")
+        logger.error(f"Error adding row mappings: {str(e)}")
         return False
 
 def get_unit_measurement_description(value: str) -> str:
@@ -430,12 +618,20 @@ def validate_column_values(df: pd.DataFrame, column: str, acceptable_values: Lis
 
         logger.info(f"Acceptable values for {column}: {acceptable_values}")
 
-        # Get unique values from the column
-        unique_values = df[column].dropna().unique().tolist()
+        # Get unique values from the column; an unmapped (all-empty) column has nothing to check
+        values = df[column].dropna()
+        if values.empty:
+            logger.info(f"All {column} values are valid")
+            return {
+                "valid": True,
+                "message": f"All {column} values are valid"
+            }
+        unique_values = values.unique().tolist()
         logger.info(f"Unique values found in {column}: {unique_values}")
 
-        # Check if all unique values are acceptable
-        invalid_values = [val for val in unique_values if val not in acceptable_values]
+        # Check if all unique values are acceptable (set lookup instead of scanning the list per value)
+        acceptable_set = set(acceptable_values)
+        invalid_values = [val for val in unique_values if val not in acceptable_set]
 
         if invalid_values:
             logger.warning(f"Invalid {column} values found: {invalid_values}")
@@ -488,6 +684,20 @@ def validate_column_values(df: pd.DataFrame, column: str, acceptable_values: Lis
             "message": f"Error validating: {str(e)}"
         }
 
+# Acceptable values for Main Unit Measurement - include all formats
+MAIN_UNIT_MEASUREMENT_VALUES = ["100", "101", "102", "103", "104", "105", "106", "107", "109",
+                                "110", "112", "113", "114", "116", "120",
+                                "ΖΕΥΓ", "ΤΕΜ", "ΚΙΛ", "ΤΟΝ", "ΜΕΤ", "m2", "ΔΟΧ", "ΧΚΙΒ", "ΚΟΥ",
+                                "ΣΑΚ", "ΛΙΤ", "ΜΜΗΚ", "ΚΑΝ", "ΚΙΒ", "ΣΕΤ",
+                                "100 ΖΕΥΓ", "101 ΤΕΜ", "102 ΚΙΛ", "103 ΤΟΝ", "104 ΜΕΤ", "105 m2",
+                                "106 ΔΟΧ", "107 ΧΚΙΒ", "109 ΚΟΥ", "110 ΣΑΚ", "112 ΛΙΤ",
+                                "113 ΜΜΗΚ", "114 ΚΑΝ", "116 ΚΙΒ", "120 ΣΕΤ"]
+
+# Acceptable values for Alternative Unit Measurement - only include combined format
+ALTERNATIVE_UNIT_MEASUREMENT_VALUES = ["100 ΖΕΥΓ", "101 ΤΕΜ", "102 ΚΙΛ", "103 ΤΟΝ", "104 ΜΕΤ", "105 m2",
+                                       "106 ΔΟΧ", "107 ΧΚΙΒ", "109 ΚΟΥ", "110 ΣΑΚ", "112 ΛΙΤ",
+                                       "113 ΜΜΗΚ", "114 ΚΑΝ", "116 ΚΙΒ", "120 ΣΕΤ"]
+
 def validate_main_unit_measurement(df: pd.DataFrame) -> Dict[str, Any]:
     """
     Validate Main Unit Measurement values against acceptable values
@@ -498,16 +708,7 @@ def validate_main_unit_measurement(df: pd.DataFrame) -> Dict[str, Any]:
     Returns:
         Dictionary with validation results
     """
-    # Define acceptable values for Main Unit Measurement - include all formats
-    acceptable_values = ["100", "101", "102", "103", "104", "105", "106", "107", "109", 
-                         "110", "112", "113", "114", "116", "120",
-                         "ΖΕΥΓ", "ΤΕΜ", "ΚΙΛ", "ΤΟΝ", "ΜΕΤ", "m2", "ΔΟΧ", "ΧΚΙΒ", "ΚΟΥ", 
-                         "ΣΑΚ", "ΛΙΤ", "ΜΜΗΚ", "ΚΑΝ", "ΚΙΒ", "ΣΕΤ",
-                         "100 ΖΕΥΓ", "101 ΤΕΜ", "102 ΚΙΛ", "103 ΤΟΝ", "104 ΜΕΤ", "105 m2", 
-                         "106 ΔΟΧ", "107 ΧΚΙΒ", "109 ΚΟΥ", "110 ΣΑΚ", "112 ΛΙΤ", 
-                         "113 ΜΜΗΚ", "114 ΚΑΝ", "116 ΚΙΒ", "120 ΣΕΤ"]
-
-    return validate_column_values(df, 'Main Unit Measurement', acceptable_values)
+    return validate_column_values(df, 'Main Unit Measurement', MAIN_UNIT_MEASUREMENT_VALUES)
 
 def validate_alternative_unit_measurement(df: pd.DataFrame) -> Dict[str, Any]:
     """
@@ -519,12 +720,7 @@ def validate_alternative_unit_measurement(df: pd.DataFrame) -> Dict[str, Any]:
     Returns:
         Dictionary with validation results
     """
-    # Define acceptable values for Alternative Unit Measurement - only include combined format
-    acceptable_values = ["100 ΖΕΥΓ", "101 ΤΕΜ", "102 ΚΙΛ", "103 ΤΟΝ", "104 ΜΕΤ", "105 m2", 
-                         "106 ΔΟΧ", "107 ΧΚΙΒ", "109 ΚΟΥ", "110 ΣΑΚ", "112 ΛΙΤ", 
-                         "113 ΜΜΗΚ", "114 ΚΑΝ", "116 ΚΙΒ", "120 ΣΕΤ"]
-
-    return validate_column_values(df, 'Alternative Unit Measurement', acceptable_values)
+    return validate_column_values(df, 'Alternative Unit Measurement', ALTERNATIVE_UNIT_MEASUREMENT_VALUES)
 
 def extract_numeric_part(value):
     """
@@ -593,7 +789,7 @@ def export_to_excel(df: pd.DataFrame, output_path: str) -> str:
             export_df['Alternative Unit Measurement'] = export_df['Alternative Unit Measurement'].apply(extract_numeric_part)
 
         # Create a writer with the specified output path
-        with pd.ExcelWriter(output_path, engine='openpyxl') as writer:
+        with pd.ExcelWriter(output_path, engine=EXCEL_WRITER_ENGINE) as writer:
             # Convert barcode columns to string to ensure they're treated as text
             if 'Product Barcode' in export_df.columns:
                 export_df['Product Barcode'] = export_df['Product Barcode'].astype(str)
@@ -611,14 +807,22 @@ def export_to_excel(df: pd.DataFrame, output_path: str) -> str:
             worksheet = writer.sheets['Sheet1']
 
             # Format barcode columns as text
-            for col_idx, col_name in enumerate(export_df.columns):
-                if col_name in ['Product Barcode', 'Box Barcode', 'Pallete Barcode']:
-                    # Excel column letters start from A
-                    col_letter = chr(65 + col_idx)
-                    # Format all cells in the column as text (skip header row)
-                    for row_idx in range(2, len(export_df) + 2):  # +2 because Excel is 1-indexed and we have a header row
-                        cell = f"{col_letter}{row_idx}"
-                        worksheet[cell].number_format = '@'
+            barcode_columns = ['Product Barcode', 'Box Barcode', 'Pallete Barcode']
+            if EXCEL_WRITER_ENGINE == "xlsxwriter":
+                # A column format applies to every cell of the column written without a format of its own
+                text_format = writer.book.add_format({'num_format': '@'})
+                for col_idx, col_name in enumerate(export_df.columns):
+                    if col_name in barcode_columns:
+                        worksheet.set_column(col_idx, col_idx, None, text_format)
+            else:
+                for col_idx, col_name in enumerate(export_df.columns):
+                    if col_name in barcode_columns:
+                        # Excel column letters start from A
+                        col_letter = chr(65 + col_idx)
+                        # Format all cells in the column as text (skip header row)
+                        for row_idx in range(2, len(export_df) + 2):  # +2 because Excel is 1-indexed and we have a header row
+                            cell = f"{col_letter}{row_idx}"
+                            worksheet[cell].number_format = '@'
 
         logger.info(f"Successfully exported {len(export_df)} rows to Excel file with barcode columns formatted as text")
         return output_path
@@ -683,6 +887,9 @@ def get_column_mapping_template() -> Dict[str, str]:
     """
     return {col: "" for col in REQUIRED_COLUMNS}
 
+# Rows scanned first when looking for a column's leading unique values
+UNIQUE_VALUES_SAMPLE_ROWS = 1000
+
 def get_unique_column_values(df: pd.DataFrame, max_values: int = 3) -> Dict[str, List[str]]:
     """
     Get unique values for each column in the DataFrame
@@ -699,8 +906,11 @@ def get_unique_column_values(df: pd.DataFrame, max_values: int = 3) -> Dict[str,
         unique_values = {}
 
         for col in df.columns:
-            # Get unique values for the column, excluding NaN values
-            col_values = df[col].dropna().unique()
+            # unique() keeps first-seen order, so the first max_values unique values of a
+            # leading slice are those of the whole column; scan it all only if the slice falls short
+            col_values = df[col].iloc[:UNIQUE_VALUES_SAMPLE_ROWS].dropna().unique()
+            if len(col_values) < max_values and len(df) > UNIQUE_VALUES_SAMPLE_ROWS:
+                col_values = df[col].dropna().unique()
 
             # Convert all values to strings and limit to max_values
             col_values = [str(val) for val in col_values[:max_values]]
@@ -12,6 +12,14 @@ from src.utils.logger import get_app_logger, get_error_logger
 app_logger = get_app_logger()
 error_logger = get_error_logger()
 
+# Mail settings, read once at startup
+GMAIL_USER = os.getenv("GMAIL_USER")
+GMAIL_PASS = os.getenv("GMAIL_PASS")
+DEFAULT_MAIL_FOLDER = os.getenv("MAIL_FOLDER", "INBOX")
+
+if not GMAIL_USER or not GMAIL_PASS:
+    error_logger.error("Missing Gmail credentials (GMAIL_USER and/or GMAIL_PASS). Email scanning is unavailable.")
+
 def list_mail_folders():
     """
     List all available mail folders in the Gmail account
@@ -55,9 +63,8 @@ def connect_to_gmail():
         imaplib.IMAP4_SSL or None: IMAP connection object or None if connection fails
     """
     try:
-        # Get credentials from environment variables
-        gmail_user = os.getenv("GMAIL_USER")
-        gmail_pass = os.getenv("GMAIL_PASS")
+        gmail_user = GMAIL_USER
+        gmail_pass = GMAIL_PASS
 
         app_logger.info(f"Attempting to connect to Gmail with user: {gmail_user}")
 
@@ -101,6 +108,123 @@ def connect_to_gmail():
         error_logger.error(error_msg)
         return None
 
+def make_email_id(folder: str, uid: str) -> str:
+    """
+    Build the email ID handed to the frontend from the folder name and the message UID
+    """
+    return f"{folder}:{uid}"
+
+def parse_email_id(email_id: str) -> Optional[Tuple[str, str]]:
+    """
+    Split an email ID built by make_email_id into (folder, uid)
+
+    Returns:
+        Optional[Tuple[str, str]]: Folder and UID, or None if the ID is not in that format
+    """
+    folder, _, uid = email_id.rpartition(":")
+    if not folder or not uid.isdigit():
+        return None
+    return folder, uid
+
+def parse_email_with_attachments(raw_email: bytes, email_id: str, mail_folder: str) -> Optional[Dict]:
+    """
+    Parse a raw email and collect its Excel attachments
+
+    Args:
+        raw_email (bytes): RFC822 message
+        email_id (str): ID to report for the email
+        mail_folder (str): Folder the email was read from
+
+    Returns:
+        Optional[Dict]: Email information and attachment details, or None if it has no Excel attachments
+    """
+    email_message = email.message_from_bytes(raw_email)
+
+    # Get email details
+    subject = decode_email_header(email_message["Subject"])
+    from_address = decode_email_header(email_message["From"])
+    date_str = email_message["Date"]
+
+    # Parse the date
+    try:
+        date_obj = email.utils.parsedate_to_datetime(date_str)
+        date_formatted = date_obj.strftime("%Y-%m-%d %H:%M:%S")
+    except:
+        date_formatted = date_str
+
+    # Check for attachments
+    attachments = []
+
+    if email_message.is_multipart():
+        for part in email_message.walk():
+            if part.get_content_maintype() == 'multipart':
+                continue
+
+            filename = part.get_filename()
+            if filename:
+                # Decode filename if needed
+                filename = decode_email_header(filename)
+
+                # Check if it's an Excel file
+                if filename.lower().endswith(('.xls', '.xlsx')):
+                    content_type = part.get_content_type()
+                    attachments.append({
+                        "filename": filename,
+                        "content_type": content_type,
+                        "part": part
+                    })
+
+    if not attachments:
+        return None
+
+    return {
+        "id": email_id,
+        "subject": subject,
+        "from": from_address,
+        "date": date_formatted,
+        "folder": mail_folder,  # Add folder information
+        "attachments": [{"filename": a["filename"], "content_type": a["content_type"]} for a in attachments],
+        "_raw_attachments": attachments  # Keep raw attachment data for later use
+    }
+
+def fetch_single_email_by_uid(folder: str, uid: str) -> Optional[Dict]:
+    """
+    Fetch one email by folder and UID, without scanning the folder
+
+    Args:
+        folder (str): Mail folder containing the email
+        uid (str): UID of the email in that folder
+
+    Returns:
+        Optional[Dict]: Email information and attachment details, or None if not found
+    """
+    mail = connect_to_gmail()
+    if not mail:
+        return None
+
+    try:
+        status, data = mail.select(folder)
+        if status != 'OK':
+            error_logger.error(f"Failed to select mail folder '{folder}': {data[0].decode() if data else 'Unknown error'}")
+            return None
+
+        status, msg_data = mail.uid('FETCH', uid, '(RFC822)')
+        mail.close()
+
+        if status != 'OK' or not msg_data or not isinstance(msg_data[0], tuple):
+            app_logger.info(f"Email {uid} not found in folder '{folder}'")
+            return None
+
+        return parse_email_with_attachments(msg_data[0][1], make_email_id(folder, uid), folder)
+    except Exception as e:
+        error_logger.error(f"Error fetching email {uid} from folder '{folder}': {str(e)}")
+        return None
+    finally:
+        try:
+            mail.logout()
+        except Exception:
+            pass
+
 def get_emails_with_attachments(days: int = 7, folders: List[str] = None) -> List[Dict]:
     """
     Scan emails for attachments in the specified folders
@@ -119,7 +243,7 @@ def get_emails_with_attachments(days: int = 7, folders: List[str] = None) -> Lis
 
         # Use provided folders or default to INBOX
         if not folders:
-            folders = [os.getenv("MAIL_FOLDER", "INBOX")]
+            folders = [DEFAULT_MAIL_FOLDER]
 
         email_list = []
 
@@ -147,7 +271,7 @@ def get_emails_with_attachments(days: int = 7, folders: List[str] = None) -> Lis
 
             # Search for emails from the last N days
             search_criteria = f'(SINCE "{date_N_days_ago}")'
-            status, messages = mail.search(None, search_criteria)
+            status, messages = mail.uid('SEARCH', None, search_criteria)
 
             if status != 'OK':
                 error_logger.error(f"Error searching for emails in folder '{mail_folder}': {status}")
@@ -159,61 +283,18 @@ def get_emails_with_attachments(days: int = 7, folders: List[str] = None) -> Lis
                 # Skip this folder and continue with the next one
                 continue
 
-            # Process each email in this folder
-            for message_id in messages[0].split():
-                status, msg_data = mail.fetch(message_id, '(RFC822)')
+            # Process each email in this folder. UIDs (unlike sequence numbers) stay valid
+            # across sessions, so an email can later be fetched again directly by its ID.
+            for uid in messages[0].split():
+                status, msg_data = mail.uid('FETCH', uid, '(RFC822)')
 
-                if status != 'OK':
-                    error_logger.error(f"Error fetching email {message_id} from folder '{mail_folder}': {status}")
+                if status != 'OK' or not msg_data or not isinstance(msg_data[0], tuple):
+                    error_logger.error(f"Error fetching email {uid} from folder '{mail_folder}': {status}")
                     continue
 
-                raw_email = msg_data[0][1]
-                email_message = email.message_from_bytes(raw_email)
-
-                # Get email details
-                subject = decode_email_header(email_message["Subject"])
-                from_address = decode_email_header(email_message["From"])
-                date_str = email_message["Date"]
-
-                # Parse the date
-                try:
-                    date_obj = email.utils.parsedate_to_datetime(date_str)
-                    date_formatted = date_obj.strftime("%Y-%m-%d %H:%M:%S")
-                except:
-                    date_formatted = date_str
-
-                # Check for attachments
-                attachments = []
-
-                if email_message.is_multipart():
-                    for part in email_message.walk():
-                        if part.get_content_maintype() == 'multipart':
-                            continue
-
-                        filename = part.get_filename()
-                        if filename:
-                            # Decode filename if needed
-                            filename = decode_email_header(filename)
-
-                            # Check if it's an Excel file
-                            if filename.lower().endswith(('.xls', '.xlsx')):
-                                content_type = part.get_content_type()
-                                attachments.append({
-                                    "filename": filename,
-                                    "content_type": content_type,
-                                    "part": part
-                                })
-
-                if attachments:
-                    email_list.append({
-                        "id": message_id.decode(),
-                        "subject": subject,
-                        "from": from_address,
-                        "date": date_formatted,
-                        "folder": mail_folder,  # Add folder information
-                        "attachments": [{"filename": a["filename"], "content_type": a["content_type"]} for a in attachments],
-                        "_raw_attachments": attachments  # Keep raw attachment data for later use
-                    })
+                email_data = parse_email_with_attachments(msg_data[0][1], make_email_id(mail_folder, uid.decode()), mail_folder)
+                if email_data:
+                    email_list.append(email_data)
 
             # Close the current mailbox before moving to the next one
             mail.close()
@@ -257,7 +338,8 @@ def save_attachment_from_email(email_data: Dict, attachment_index: int = 0) -> O
         unique_filename = f"{timestamp}_email_{filename}"
         file_path = os.path.join("src/data/uploads", unique_filename)
 
-        # Save the attachment
+        # Save the attachment (the uploads folder may have just been swapped out by a clear)
+        os.makedirs("src/data/uploads", exist_ok=True)
         with open(file_path, 'wb') as f:
             f.write(part.get_payload(decode=True))
 
@@ -1,9 +1,11 @@
 import os
 import pandas as pd
+import openpyxl
 import tempfile
+import shutil
 import sys
 sys.path.append('../')
-from data.etl import read_excel, map_columns, transform_data, export_to_excel, process_excel_file
+from data.etl import read_excel, read_excel_summary, map_columns, apply_value_mapping, transform_data, export_to_excel, process_excel_file
 
 def create_test_excel():
     """Create a test Excel file with sample data"""
@@ -56,6 +58,87 @@ def test_read_excel():
         if os.path.exists(test_file):
             os.remove(test_file)
 
+def test_read_excel_summary():
+    """Test reading column names and unique values without loading the whole sheet"""
+    test_file = create_test_excel()
+
+    try:
+        column_names, unique_values, row_count = read_excel_summary(test_file, max_values=2)
+        df = read_excel(test_file)
+
+        # Same columns and row count as the full read
+        assert column_names == df.columns.tolist()
+        assert row_count == len(df)
+
+        # At most max_values values per column, as strings
+        assert unique_values['Item Code'] == ['P001', 'P002']
+        assert unique_values['Item Height'] == ['10', '15']
+
+        print("✅ read_excel_summary test passed")
+    finally:
+        # Clean up
+        if os.path.exists(test_file):
+            os.remove(test_file)
+
+def test_read_excel_summary_duplicate_headers():
+    """Test that repeated and blank headers are named like pandas names them"""
+    fd, test_file = tempfile.mkstemp(suffix='.xlsx')
+    os.close(fd)
+
+    try:
+        headers = ['A', 'A', 'A.1', None, 'Unnamed: 3', 1, 1.0, '1.1']
+        rows = [[f"{header}-{row}" for header in headers] for row in range(5)]
+        workbook = openpyxl.Workbook()
+        worksheet = workbook.active
+        worksheet.append(headers)
+        for row in rows:
+            worksheet.append(row)
+        workbook.save(test_file)
+
+        column_names, unique_values, _ = read_excel_summary(test_file)
+        df = pd.read_excel(test_file)
+
+        # Same names, in the same order, and no column lost to a name clash
+        assert column_names == df.columns.tolist()
+        assert len(unique_values) == len(headers)
+
+        print("✅ read_excel_summary duplicate headers test passed")
+    finally:
+        # Clean up
+        if os.path.exists(test_file):
+            os.remove(test_file)
+
+def test_read_excel_summary_leading_blank_row():
+    """Test that a leading blank row stays the header row and integer cells are not shown as floats"""
+    fd, test_file = tempfile.mkstemp(suffix='.xlsx')
+    os.close(fd)
+    # Same workbook under another extension, summarized through pandas instead of openpyxl
+    other_file = test_file[:-len('.xlsx')] + '.xls'
+
+    try:
+        workbook = openpyxl.Workbook()
+        worksheet = workbook.active
+        worksheet.append([])
+        worksheet.append(['Code', 'Qty'])
+        worksheet.append(['A1', 5])
+        worksheet.append(['A2', None])
+        worksheet.append(['A3', 7])
+        workbook.save(test_file)
+        shutil.copyfile(test_file, other_file)
+
+        for path in (test_file, other_file):
+            column_names, unique_values, row_count = read_excel_summary(path)
+            assert column_names == pd.read_excel(test_file).columns.tolist() == ['Unnamed: 0', 'Unnamed: 1']
+            assert unique_values == {'Unnamed: 0': ['Code', 'A1', 'A2'], 'Unnamed: 1': ['Qty', '5', '7']}
+            assert row_count == 4
+
+        print("✅ read_excel_summary leading blank row test passed")
+    finally:
+        # Clean up
+        for path in (test_file, other_file):
+            if os.path.exists(path):
+                os.remove(path)
+
 def test_map_columns():
     """Test mapping columns from source to target format"""
     # Create a test DataFrame
@@ -94,6 +177,23 @@ def test_map_columns():
 
     print("✅ map_columns test passed")
 
+def test_apply_value_mapping():
+    """Test replacing mapped values in a column"""
+    # Row mappings are keyed by the string form of the cell value
+    units = pd.Series([101, 'XYZ', 102])
+    mapped = apply_value_mapping(units, {'101': 'ΤΕΜ', 'XYZ': 'ΚΙΛ'}, match_as_str=True)
+    assert mapped.tolist() == ['ΤΕΜ', 'ΚΙΛ', 102]
+
+    # Value mappings from the frontend match the raw value
+    mapped = apply_value_mapping(units, {'101': 'ΤΕΜ', 'XYZ': 'ΚΙΛ'})
+    assert mapped.tolist() == [101, 'ΚΙΛ', 102]
+
+    # Columns without any mapped value are returned unchanged
+    numbers = pd.Series([1, 2, 3])
+    assert apply_value_mapping(numbers, {'9': 'x'}, match_as_str=True) is numbers
+
+    print("✅ apply_value_mapping test passed")
+
 def test_transform_data():
     """Test transforming data"""
     # Create a test DataFrame
@@ -295,7 +395,11 @@ def test_process_excel_file():
 if __name__ == "__main__":
     print("Running ETL tests...")
     test_read_excel()
+    test_read_excel_summary()
+    test_read_excel_summary_duplicate_headers()
+    test_read_excel_summary_leading_blank_row()
     test_map_columns()
+    test_apply_value_mapping()
     test_transform_data()
     test_export_to_excel()
     test_process_excel_file()
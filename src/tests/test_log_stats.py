@@ -0,0 +1,67 @@
+import os
+import sys
+import importlib
+from datetime import datetime, timedelta
+
+import pytest
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+
+
+@pytest.fixture
+def main_module(monkeypatch, tmp_path_factory):
+    """Import main.py from the repository root, where its relative paths resolve, logging to a temp folder"""
+    monkeypatch.chdir(REPO_ROOT)
+    monkeypatch.syspath_prepend(REPO_ROOT)
+    monkeypatch.setenv("LOGS_DIR", str(tmp_path_factory.getbasetemp() / "logs"))
+    return importlib.import_module("main")
+
+
+def make_logs(count=200):
+    """Build log entries in the shape returned by get_all_logs, newest first"""
+    now = datetime.now().replace(microsecond=0)
+    levels = ["INFO", "WARNING", "ERROR"]
+    types = ["api", "app", "data_processing", "errors"]
+    logs = []
+    for i in range(count):
+        timestamp = now - timedelta(minutes=37 * i)
+        log_type = types[i % len(types)]
+        level = levels[i % len(levels)]
+        if i % 10 == 0:
+            line = f"{timestamp:%Y-%m-%d %H:%M:%S} - {log_type} - {level} - message {i % 7}"
+            sep = " - "
+        elif i % 13 == 0:
+            line = f"{timestamp:%Y-%m-%d %H:%M:%S}\t[{log_type}]\t[{level}]"
+            sep = "\t"
+        else:
+            line = f"{timestamp:%Y-%m-%d %H:%M:%S}\t[{log_type}]\t[{level}]\t[message {i % 7}]"
+            sep = "\t"
+        logs.append({"timestamp": timestamp, "type": log_type, "message": line, "sep": sep})
+    return logs
+
+
+@pytest.mark.parametrize("kwargs", [
+    {"log_type": "all", "days": 7},
+    {"log_type": "api", "days": 3},
+    {"log_type": "errors", "days": 30},
+])
+def test_vectorized_stats_match_loop(main_module, monkeypatch, kwargs):
+    """The pandas aggregation must produce the same statistics as the per-log loop"""
+    logs = make_logs()
+
+    monkeypatch.setattr(main_module, "LOG_STATS_VECTORIZE_THRESHOLD", len(logs) + 1)
+    loop_stats = main_module.process_logs_for_stats(list(logs), **kwargs)
+    monkeypatch.setattr(main_module, "LOG_STATS_VECTORIZE_THRESHOLD", 0)
+    vectorized_stats = main_module.process_logs_for_stats(list(logs), **kwargs)
+
+    loop_messages = loop_stats.pop("common_messages")
+    vectorized_messages = vectorized_stats.pop("common_messages")
+    assert loop_stats == vectorized_stats
+    assert sorted(m["count"] for m in loop_messages) == sorted(m["count"] for m in vectorized_messages)
+
+
+def test_stats_empty_window(main_module):
+    """No matching logs yields the empty statistics shape"""
+    stats = main_module.process_logs_for_stats(make_logs(), log_type="missing")
+    assert stats["total"] == 0
+    assert stats["common_messages"] == []
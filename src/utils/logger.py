@@ -2,17 +2,18 @@ import logging
 import os
 from datetime import datetime
 from logging.handlers import RotatingFileHandler
-from typing import List, Tuple
+from typing import List, Optional, Tuple
+
+# Root logs directory (override via env var, e.g. to keep test runs out of the repo) and cap
+LOGS_DIR = os.getenv("LOGS_DIR", "src/logs")
 
 # Create logs directory if it doesn't exist
-os.makedirs("src/logs/api", exist_ok=True)
-os.makedirs("src/logs/app", exist_ok=True)
-os.makedirs("src/logs/data_processing", exist_ok=True)
-os.makedirs("src/logs/database", exist_ok=True)
-os.makedirs("src/logs/errors", exist_ok=True)
-
-# Root logs directory and cap
-LOGS_DIR = "src/logs"
+os.makedirs(os.path.join(LOGS_DIR, "api"), exist_ok=True)
+os.makedirs(os.path.join(LOGS_DIR, "app"), exist_ok=True)
+os.makedirs(os.path.join(LOGS_DIR, "data_processing"), exist_ok=True)
+os.makedirs(os.path.join(LOGS_DIR, "database"), exist_ok=True)
+os.makedirs(os.path.join(LOGS_DIR, "errors"), exist_ok=True)
+
 # Allow override via env var; default 100 MB
 MAX_LOGS_TOTAL_MB = int(os.getenv("LOGS_MAX_TOTAL_MB", "100"))
 MAX_LOGS_TOTAL_BYTES = MAX_LOGS_TOTAL_MB * 1024 * 1024
@@ -129,103 +130,113 @@ enforce_logs_quota()
 def get_api_logger():
     """Get logger for API operations"""
     today = datetime.now().strftime("%Y-%m-%d")
-    log_file = f"src/logs/api/api_{today}.log"
+    log_file = os.path.join(LOGS_DIR, "api", f"api_{today}.log")
     return get_logger("api", log_file)
 
 def get_app_logger():
     """Get logger for general application operations"""
     today = datetime.now().strftime("%Y-%m-%d")
-    log_file = f"src/logs/app/app_{today}.log"
+    log_file = os.path.join(LOGS_DIR, "app", f"app_{today}.log")
     return get_logger("app", log_file)
 
 def get_data_processing_logger():
     """Get logger for data processing operations"""
     today = datetime.now().strftime("%Y-%m-%d")
-    log_file = f"src/logs/data_processing/data_processing_{today}.log"
+    log_file = os.path.join(LOGS_DIR, "data_processing", f"data_processing_{today}.log")
     return get_logger("data_processing", log_file)
 
 def get_database_logger():
     """Get logger for database operations"""
     today = datetime.now().strftime("%Y-%m-%d")
-    log_file = f"src/logs/database/database_{today}.log"
+    log_file = os.path.join(LOGS_DIR, "database", f"database_{today}.log")
     return get_logger("database", log_file)
 
 def get_error_logger():
     """Get logger for errors"""
     today = datetime.now().strftime("%Y-%m-%d")
-    log_file = f"src/logs/errors/errors_{today}.log"
+    log_file = os.path.join(LOGS_DIR, "errors", f"errors_{today}.log")
     return get_logger("errors", log_file, level=logging.ERROR)
 
 # Function to get all logs for display in UI
-def get_all_logs(max_entries=100):
+def get_all_logs(max_entries=100, types: Optional[List[str]] = None, since: Optional[datetime] = None):
     """
     Get all logs from all log files
 
     Args:
         max_entries: Maximum number of log entries to return. If None, returns all logs.
+        types: Only return entries of these log types (api, app, ...). If None, returns all types.
+        since: Only return entries logged at or after this time. If None, no lower bound.
 
     Returns:
         List of log entries sorted by date (newest first)
     """
     logs = []
+    since_ts = since.timestamp() if since is not None else None
 
-    # Get all log files
+    # Get all log files, skipping other loggers' folders and files last written before `since`
     log_files = []
-    for root, _, files in os.walk("src/logs"):
+    for root, _, files in os.walk(LOGS_DIR):
+        if types is not None and os.path.basename(root) not in types:
+            continue
         for file in files:
             if file.endswith(".log"):
-                log_files.append(os.path.join(root, file))
+                path = os.path.join(root, file)
+                if since_ts is not None:
+                    try:
+                        if os.path.getmtime(path) < since_ts:
+                            continue
+                    except OSError:
+                        continue
+                log_files.append(path)
 
-    # Read log entries from each file
+    # Read log entries from each file. Lines are tokenized as bytes and decoded
+    # once, so a stray non-UTF-8 byte no longer causes the whole file to be skipped.
     for log_file in log_files:
         try:
-            with open(log_file, "r") as f:
-                for line in f:
+            with open(log_file, "rb") as f:
+                for raw_line in f:
                     # Parse log entry
                     try:
+                        line = raw_line.strip()
                         # Check if the log entry uses tabs or dashes as separators
-                        if "\t" in line:
+                        if b"\t" in line:
                             # New format with tabs
-                            parts = line.split("\t")
-                            timestamp_str = parts[0].strip()
-                            timestamp = datetime.strptime(timestamp_str, DATE_FORMAT)
-
-                            # Extract component from the log entry
-                            if len(parts) >= 2:
-                                component_part = parts[1].strip()
-                                if component_part.startswith("[") and component_part.endswith("]"):
-                                    component = component_part[1:-1]  # Remove brackets
-                                else:
-                                    component = component_part
-                            else:
-                                # Fallback to getting log type from file path
-                                component = os.path.basename(os.path.dirname(log_file))
+                            sep = "\t"
+                            parts = line.split(b"\t", 2)
+                            has_component = len(parts) >= 2
                         else:
                             # Old format with dashes
-                            timestamp_str = line.split(" - ")[0].strip()
-                            timestamp = datetime.strptime(timestamp_str, DATE_FORMAT)
-
-                            # Extract log level and component from the log entry
-                            parts = line.split(" - ")
-                            if len(parts) >= 3:
-                                # Try to extract component from the log entry
-                                component_part = parts[1].strip()
-                                if component_part.startswith("[") and component_part.endswith("]"):
-                                    component = component_part[1:-1]  # Remove brackets
-                                else:
-                                    component = component_part
+                            sep = " - "
+                            parts = line.split(b" - ", 2)
+                            has_component = len(parts) >= 3
+
+                        timestamp = datetime.strptime(parts[0].strip().decode("ascii"), DATE_FORMAT)
+
+                        # Extract component from the log entry
+                        if has_component:
+                            component_part = parts[1].strip().decode("utf-8", errors="replace")
+                            if component_part.startswith("[") and component_part.endswith("]"):
+                                component = component_part[1:-1]  # Remove brackets
                             else:
-                                # Fallback to getting log type from file path
-                                component = os.path.basename(os.path.dirname(log_file))
+                                component = component_part
+                        else:
+                            # Fallback to getting log type from file path
+                            component = os.path.basename(os.path.dirname(log_file))
 
                         # Use component as log_type
                         log_type = component
+                        if types is not None and log_type not in types:
+                            continue
+                        if since is not None and timestamp < since:
+                            continue
 
+                        message = line.decode("utf-8", errors="replace")
                         logs.append({
                             "timestamp": timestamp,
                             "type": log_type,
-                            "message": line.strip(),
-                            "raw": line.strip()
+                            "message": message,
+                            "raw": message,
+                            "sep": sep
                         })
                     except Exception:
                         # Skip malformed log entries